@@ -5,20 +5,83 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to disable
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg and SQLAlchemy's adapter, 0 behind pgbouncer
+    DB_ECHO: bool = False  # log every statement through SQLAlchemy
+
+    # Query instrumentation (see app/database.py); 0 disables the slow log
+    DB_SLOW_QUERY_MS: float = 200
+    DB_QUERY_TEMPLATES_MAX: int = 500
+    DB_QUERY_TEMPLATE_LENGTH: int = 1000
 
     # Security
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 60
 
+    # Verified-token cache (see app/security.py); 0 disables it
+    TOKEN_CACHE_TTL_SECONDS: float = 300
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Authenticated-user cache (see app/services/user_cache.py)
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # Serialized GET /tasks/ responses (see app/services/task_versions.py);
+    # 0 disables the cache, ETag/304 handling stays on
+    TASK_LIST_CACHE_MAX_SIZE: int = 1000
+    TASK_LIST_CACHE_TTL_SECONDS: float = 60
+
+    # GET /tasks/stream (see app/services/task_events.py)
+    TASK_STREAM_QUEUE_SIZE: int = 100  # events buffered per connection before a resync
+    TASK_STREAM_HEARTBEAT_SECONDS: float = 15
+    TASK_STREAM_TICKET_SECONDS: int = 30  # lifetime of a ?ticket= from POST /tasks/stream/ticket
+
+    # GET /tasks/changes. Writes newer than the settle window are held back
+    # until transactions that started before them have committed.
+    TASK_CHANGES_SETTLE_SECONDS: float = 2
+    TASK_TOMBSTONE_RETENTION_DAYS: int = 30  # older cursors get a 410
+
+    # POST /tasks/{id}/time buffering (see app/services/time_log.py)
+    TIME_LOG_FLUSH_SECONDS: float = 1
+    TIME_LOG_BATCH_SIZE: int = 500  # entries per INSERT; a full batch flushes early
+    TIME_LOG_MAX_BUFFER: int = 10000  # beyond this new entries get a 503
+    TIME_LOG_COMPACT_SECONDS: float = 10
+    TIME_LOG_COMPACT_BATCH_SIZE: int = 5000
+
+    # Password hashing pool (see app/services/hash_pool.py)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
     # AI
     OPENAI_API_KEY: str = ""
     AI_MODE: str = "live"  # "stub" or "live"
     GEMINI_API_KEY: str = ""
     GROQ_API_KEY: str = ""
+    GROQ_BASE_URL: str = ""  # empty uses the SDK default
+    AI_TIMEOUT_SECONDS: float = 10
+    AI_MAX_CONCURRENCY: int = 8
+    AI_BATCH_CONCURRENCY: int = 4  # per /ai/suggest/batch request
+    AI_BREAKER_FAILURE_RATE: float = 0.5
+    AI_BREAKER_SLOW_CALL_SECONDS: float = 5
+    AI_BREAKER_WINDOW: int = 20
+    AI_BREAKER_MIN_CALLS: int = 5
+    AI_BREAKER_OPEN_SECONDS: float = 30
+    AI_CACHE_TTL_SECONDS: float = 3600
+    AI_CACHE_MAX_SIZE: int = 1000
 
     # App
     APP_ENV: str = "development"
+    # Shared directory for per-worker metric files; set when running more
+    # than one worker so /metrics aggregates across them
+    METRICS_MULTIPROC_DIR: str = ""
+    # How long the log writer thread gathers lines before writing a batch
+    # (see app/middleware.py); 0 writes as soon as the queue is drained
+    LOG_BATCH_SECONDS: float = 0.05
 
     class Config:
         env_file = ".env"
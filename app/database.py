@@ -1,12 +1,105 @@
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
+from app.metrics import current_request_db, metrics, observe_query, statement_template
+
+logger = logging.getLogger("sprintsync.db")
+
+
+# Queue pool that records how long connect() waits for a free connection.
+# Checkouts themselves are counted by the pool events in instrument_engine.
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def connect(self):
+        t1 = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            metrics["db_pool_timeouts_total"] += 1
+            raise
+        wait_ms = (time.perf_counter() - t1) * 1000
+        metrics["db_pool_wait_ms_total"] += wait_ms
+        metrics["db_pool_wait_ms_max"] = max(metrics["db_pool_wait_ms_max"], wait_ms)
+        return connection
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics["db_pool_checkouts_total"] += 1
+    metrics["db_pool_checked_out"] += 1
+
+
+def _checkin(dbapi_connection, connection_record):
+    metrics["db_pool_checked_out"] -= 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - context._query_start) * 1000
+    observe_query(statement, duration_ms)
+    if settings.DB_SLOW_QUERY_MS and duration_ms >= settings.DB_SLOW_QUERY_MS:
+        metrics["db_slow_queries_total"] += 1
+        request = current_request_db.get()
+        logger.warning({
+            "event": "slow_query",
+            "duration_ms": round(duration_ms, 2),
+            "statement": statement_template(statement),
+            "method": request.method if request else None,
+            "path": request.path if request else None,
+        })
+
+
+# Times every statement: per-template counts and latencies, plus the current
+# request's DB time (see observe_query), and a log line for slow statements.
+# Also counts pool checkouts, whatever the pool class.
+def instrument_engine(engine) -> None:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "checkout", _checkout)
+    event.listen(sync_engine, "checkin", _checkin)
+
+
+def engine_options(url: str) -> dict:
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    url = make_url(url)
+    # SQLite keeps SQLAlchemy's own pool choice; an in-memory database needs
+    # its single shared connection
+    if url.get_backend_name() != "sqlite":
+        options.update({
+            "poolclass": InstrumentedPool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        })
+    if url.get_driver_name() == "asyncpg":
+        # asyncpg caches statements per connection, and SQLAlchemy's asyncpg
+        # adapter keeps its own cache of prepared statements on top; behind
+        # pgbouncer both must be off, so one setting sizes both
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
 
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True if settings.APP_ENV == "development" else False,
+    **engine_options(settings.DATABASE_URL),
 )
+instrument_engine(engine)
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -16,6 +109,28 @@ AsyncSessionLocal = sessionmaker(
 )
 
 
+def pool_status(values: dict = metrics) -> dict:
+    # Size and overflow are this worker's pool (None when it is not a queue
+    # pool); the rest comes from `values`, which /metrics merges across
+    # workers, so checked_out is the server's total
+    pool = engine.pool
+    queue_pool = isinstance(pool, QueuePool)
+    checkouts = values["db_pool_checkouts_total"]
+    return {
+        "size": pool.size() if queue_pool else None,
+        "checked_out": values["db_pool_checked_out"],
+        "overflow": max(pool.overflow(), 0) if queue_pool else None,
+        "max_overflow": settings.DB_MAX_OVERFLOW if queue_pool else None,
+        "checkouts_total": checkouts,
+        "timeouts_total": values["db_pool_timeouts_total"],
+        "avg_wait_ms": (
+            round(values["db_pool_wait_ms_total"] / checkouts, 3)
+            if checkouts > 0 else 0
+        ),
+        "max_wait_ms": round(values["db_pool_wait_ms_max"], 3),
+    }
+
+
 # Base class for all models
 class Base(DeclarativeBase):
     pass
@@ -31,4 +146,10 @@ async def get_db() -> AsyncSession:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+# Dependency for streaming responses, which outlive the request-scoped
+# session from get_db and must open their own
+def get_session_factory() -> sessionmaker:
+    return AsyncSessionLocal
\ No newline at end of file
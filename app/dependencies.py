@@ -1,38 +1,43 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.config import settings
 from app.database import get_db
+from app.security import STREAM_TICKET_SCOPE, decode_token, verify_request_token
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    token = credentials.credentials
+    # HTTPBearer has already rejected requests without a bearer token.
+    # The verified payload is stashed for the logging middleware.
+    return await load_user(verify_request_token(request), db)
 
+
+async def load_user(payload: Optional[dict], db: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-
-    try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    if payload is None:
         raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise credentials_exception
+
+    user = await user_cache.get(user_id)
+    if user is not None:
+        return user
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -40,6 +45,7 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
 
+    await user_cache.set(user)
     return user
 
 
@@ -51,4 +57,25 @@ async def get_admin_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required",
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def get_stream_user(
+    request: Request,
+    ticket: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    # Browsers' EventSource cannot set headers, so streaming endpoints also
+    # take a stream ticket (see app/security.py) as ?ticket=. The
+    # Authorization header wins when present.
+    payload = verify_request_token(request)
+    if payload is None and credentials is None and ticket:
+        try:
+            payload = decode_token(ticket)
+        except JWTError:
+            payload = None
+        if payload is not None and payload.get("scope") != STREAM_TICKET_SCOPE:
+            payload = None
+        request.state.token_payload = payload
+    return await load_user(payload, db)
@@ -1,15 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.middleware import LoggingMiddleware, metrics
-from app.routers import auth, users, tasks, ai
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.middleware import LoggingMiddleware
+from app.metrics import collect, db_report, latency_report, render_prometheus
+from app.routers import auth, users, tasks, ai, analytics
 from app.config import settings
+from app.database import AsyncSessionLocal, pool_status
+from app.services.ai_service import breaker as ai_breaker, close_ai_client
+from app.services.hash_pool import HashPoolBusy
+from app.services.task_events import task_events
+from app.services.time_log import time_log
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    time_log.start(AsyncSessionLocal)
+    yield
+    await time_log.stop()
+    await task_events.close()
+    await close_ai_client()
+
 
 app = FastAPI(
     title="SprintSync API",
     description="Lean sprint management tool with AI assist",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
+# Password hashing pool is full (see app/services/hash_pool.py)
+@app.exception_handler(HashPoolBusy)
+async def hash_pool_busy(request: Request, exc: HashPoolBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many concurrent logins, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -17,10 +47,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Logging middleware
-#app.add_middleware(LoggingMiddleware)
+app.add_middleware(LoggingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -31,6 +62,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Routers
@@ -38,6 +70,7 @@ app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(tasks.router)
 app.include_router(ai.router)
+app.include_router(analytics.router)
 
 
 @app.get("/", tags=["Health"])
@@ -47,14 +80,71 @@ async def root():
 
 @app.get("/metrics", tags=["Observability"])
 async def get_metrics():
-    total = metrics["http_requests_total"]
+    values, histograms, db = collect()
+    total = values["http_requests_total"]
     avg_latency = (
-        round(metrics["total_latency_ms"] / total, 2) if total > 0 else 0
+        round(values["http_request_latency_ms_total"] / total, 2) if total > 0 else 0
     )
+    latency = latency_report(histograms)
     return {
         "http_requests_total": total,
-        "errors_total": metrics["errors_total"],
-        "ai_suggest_calls_total": metrics["ai_suggest_calls_total"],
+        "errors_total": values["errors_total"],
+        "ai_suggest_calls_total": values["ai_suggest_calls_total"],
+        "ai_suggest_upstream_total": values["ai_suggest_upstream_total"],
+        "ai_suggest_coalesced_total": values["ai_suggest_coalesced_total"],
         "avg_latency_ms": avg_latency,
-        "routes": metrics["routes"],
-    }
\ No newline at end of file
+        "user_cache_hits_total": values["user_cache_hits_total"],
+        "user_cache_misses_total": values["user_cache_misses_total"],
+        "password_hash_queue_depth": values["password_hash_queue_depth"],
+        "password_hash_rejected_total": values["password_hash_rejected_total"],
+        "task_stream": {
+            "connections": values["task_stream_connections"],
+            "events_total": values["task_stream_events_total"],
+            "resyncs_total": values["task_stream_resyncs_total"],
+        },
+        "time_log": {
+            "buffered": values["time_log_buffered"],
+            "rejected_total": values["time_log_rejected_total"],
+            "flush_errors_total": values["time_log_flush_errors_total"],
+            "flushed_total": values["time_entries_flushed_total"],
+            "compacted_total": values["time_entries_compacted_total"],
+        },
+        "ai_circuit": {
+            "state": ai_breaker.state,
+            "failure_rate": round(ai_breaker.failure_rate, 3),
+            "trips_total": ai_breaker.trips,
+            "short_circuits_total": ai_breaker.short_circuits,
+        },
+        "db_pool": pool_status(values),
+        "db": {
+            "queries_total": values["db_queries_total"],
+            "query_ms_total": round(values["db_query_ms_total"], 2),
+            "slow_queries_total": values["db_slow_queries_total"],
+            **db_report(db),
+        },
+        "latency": latency["overall"],
+        "routes": {
+            route: sum(summary["count"] for summary in statuses.values())
+            for route, statuses in latency["routes"].items()
+        },
+        "route_latency": latency["routes"],
+    }
+
+
+@app.get(
+    "/metrics/prometheus",
+    tags=["Observability"],
+    response_class=PlainTextResponse,
+)
+async def get_prometheus_metrics():
+    values, histograms, db = collect()
+    pool = pool_status(values)
+    return PlainTextResponse(
+        render_prometheus(values, histograms, db, {
+            "db_pool_overflow": pool["overflow"] or 0,
+            "ai_circuit_open": int(ai_breaker.state != "closed"),
+            "ai_circuit_trips_total": ai_breaker.trips,
+            "ai_circuit_short_circuits_total": ai_breaker.short_circuits,
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
\ No newline at end of file
@@ -0,0 +1,516 @@
+import bisect
+import glob
+import mmap
+import os
+import re
+import struct
+import threading
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, Optional
+from app.config import settings
+
+# Per-worker metric segments
+#
+# With METRICS_MULTIPROC_DIR set, every worker process mirrors its counters,
+# gauges and histogram buckets into its own memory-mapped file in that
+# directory (metrics_<pid>.db). /metrics reads every file and merges them, so
+# `uvicorn --workers N` reports totals for the whole server rather than for
+# whichever worker answered. A worker that has exited keeps contributing its
+# counters and histograms, but not its gauges (see GAUGES).
+#
+# File layout: an 8-byte header holding the number of bytes used, followed by
+# entries of [int32 key length][utf-8 key, padded to 8 bytes][float64 value].
+# Keys are only ever appended; values are overwritten in place.
+
+SEGMENT_INITIAL_SIZE = 64 * 1024
+_HEADER = struct.Struct("i4x")
+_KEY_LENGTH = struct.Struct("i")
+_VALUE = struct.Struct("d")
+
+
+def _entry(key: str) -> bytes:
+    encoded = key.encode()
+    padding = (8 - (_KEY_LENGTH.size + len(encoded)) % 8) % 8
+    return (
+        _KEY_LENGTH.pack(len(encoded))
+        + encoded
+        + b" " * padding
+        + _VALUE.pack(0.0)
+    )
+
+
+def read_segment(path: str) -> Iterator[tuple[str, float]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return
+    used = _HEADER.unpack_from(data, 0)[0]
+    pos = _HEADER.size
+    while pos < used:
+        length = _KEY_LENGTH.unpack_from(data, pos)[0]
+        pos += _KEY_LENGTH.size
+        key = data[pos:pos + length].decode()
+        pos += length + (8 - (_KEY_LENGTH.size + length) % 8) % 8
+        yield key, _VALUE.unpack_from(data, pos)[0]
+        pos += _VALUE.size
+
+
+class MmapSegment:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < SEGMENT_INITIAL_SIZE:
+            self._file.truncate(SEGMENT_INITIAL_SIZE)
+            size = SEGMENT_INITIAL_SIZE
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._positions: dict[str, int] = {}
+
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        pos = _HEADER.size
+        for key, _ in read_segment(path):
+            pos += len(_entry(key))
+            self._positions[key] = pos - _VALUE.size
+
+    def write(self, key: str, value: float) -> None:
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._append(key)
+        _VALUE.pack_into(self._mmap, pos, value)
+
+    def _append(self, key: str) -> int:
+        with self._lock:
+            if key in self._positions:
+                return self._positions[key]
+            entry = _entry(key)
+            if self._used + len(entry) > len(self._mmap):
+                self._grow(self._used + len(entry))
+            self._mmap[self._used:self._used + len(entry)] = entry
+            self._used += len(entry)
+            # Publish the entry only once it is fully written
+            _HEADER.pack_into(self._mmap, 0, self._used)
+            pos = self._used - _VALUE.size
+            self._positions[key] = pos
+            return pos
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+
+class WorkerSegment:
+    # Opens the segment lazily and per process id, so a worker forked after
+    # import gets its own file
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pid: Optional[int] = None
+        self._segment: Optional[MmapSegment] = None
+
+    def write(self, key: str, value: float) -> None:
+        pid = os.getpid()
+        if pid != self._pid:
+            os.makedirs(self.directory, exist_ok=True)
+            self._segment = MmapSegment(
+                os.path.join(self.directory, f"metrics_{pid}.db")
+            )
+            self._pid = pid
+        self._segment.write(key, value)
+
+
+worker_segment: Optional[WorkerSegment] = (
+    WorkerSegment(settings.METRICS_MULTIPROC_DIR)
+    if settings.METRICS_MULTIPROC_DIR else None
+)
+
+
+# dict whose writes are mirrored into this worker's segment
+class MetricValues(dict):
+    def __setitem__(self, key: str, value: float) -> None:
+        super().__setitem__(key, value)
+        if worker_segment is not None:
+            worker_segment.write(key, value)
+
+
+# In-memory metrics store. Names ending in _max merge across workers by
+# taking the maximum; everything else is summed. Running totals end in
+# _total, which is what makes them Prometheus counters (see
+# render_prometheus).
+metrics = MetricValues({
+    "http_requests_total": 0,
+    "errors_total": 0,
+    "ai_suggest_calls_total": 0,
+    "ai_suggest_upstream_total": 0,
+    "ai_suggest_coalesced_total": 0,
+    "http_request_latency_ms_total": 0,
+    "user_cache_hits_total": 0,
+    "user_cache_misses_total": 0,
+    "password_hash_queue_depth": 0,
+    "password_hash_rejected_total": 0,
+    "db_pool_checkouts_total": 0,
+    "db_pool_checked_out": 0,
+    "db_pool_timeouts_total": 0,
+    "db_pool_wait_ms_total": 0,
+    "db_pool_wait_ms_max": 0,
+    "db_queries_total": 0,
+    "db_query_ms_total": 0,
+    "db_slow_queries_total": 0,
+    "task_stream_connections": 0,
+    "task_stream_events_total": 0,
+    "task_stream_resyncs_total": 0,
+    "time_log_buffered": 0,
+    "time_log_rejected_total": 0,
+    "time_log_flush_errors_total": 0,
+    "time_entries_flushed_total": 0,
+    "time_entries_compacted_total": 0,
+})
+
+# Current levels rather than running totals. Only live workers' values are
+# merged: a restarted worker would otherwise leave its last reading summed in.
+GAUGES = frozenset({
+    "password_hash_queue_depth",
+    "db_pool_checked_out",
+    "task_stream_connections",
+    "time_log_buffered",
+})
+
+# Request latency bucket upper bounds in ms; a final +Inf bucket is implicit
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS, key: Optional[str] = None):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        # Segment keys, when this histogram is mirrored for other workers
+        self._keys = None
+        if key is not None:
+            self._keys = (
+                [f"{key}\t{i}" for i in range(len(self.counts))],
+                f"{key}\tsum",
+                f"{key}\tcount",
+            )
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if self._keys is not None and worker_segment is not None:
+            bucket_keys, sum_key, count_key = self._keys
+            worker_segment.write(bucket_keys[i], self.counts[i])
+            worker_segment.write(sum_key, self.sum)
+            worker_segment.write(count_key, self.count)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, bucket_count in enumerate(other.counts):
+            self.counts[i] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        # Linear interpolation inside the bucket holding the q-th
+        # observation, as Prometheus' histogram_quantile does
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if i == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[i - 1] if i > 0 else 0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return float(self.buckets[-1])
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 2) if self.count else 0,
+            "p50_ms": round(self.quantile(0.50), 2),
+            "p95_ms": round(self.quantile(0.95), 2),
+            "p99_ms": round(self.quantile(0.99), 2),
+        }
+
+
+# Latency histograms keyed by (method, route template, status code). Route
+# templates ("/tasks/{task_id}") keep the number of series bounded.
+latency: dict[tuple[str, str, int], LatencyHistogram] = {}
+
+
+def observe_request(method: str, route: str, status_code: int, latency_ms: float) -> None:
+    key = (method, route, status_code)
+    histogram = latency.get(key)
+    if histogram is None:
+        histogram = latency[key] = LatencyHistogram(
+            key=f"latency\t{method}\t{route}\t{status_code}"
+        )
+    histogram.observe(latency_ms)
+
+
+# Counters for one label set (a route, a SQL statement template), mirrored
+# into the worker segment as "<key>\t<field>". As with the top-level
+# metrics, fields ending in _max keep the maximum.
+class LabeledStats(dict):
+    def __init__(self, key: Optional[str] = None):
+        super().__init__()
+        self.key = key
+
+    def add(self, field: str, value: float) -> None:
+        if field.endswith("_max"):
+            value = max(self.get(field, 0), value)
+        else:
+            value = self.get(field, 0) + value
+        self[field] = value
+        if self.key is not None and worker_segment is not None:
+            worker_segment.write(f"{self.key}\t{field}", value)
+
+    def mirror(self) -> None:
+        for field, value in self.items():
+            worker_segment.write(f"{self.key}\t{field}", value)
+
+
+# Database time of the request being handled. LoggingMiddleware sets a fresh
+# RequestDBStats per request; the cursor hooks in app/database.py add to it.
+class RequestDBStats:
+    __slots__ = ("method", "path", "queries", "db_ms")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db_ms = 0.0
+
+
+current_request_db: ContextVar[Optional[RequestDBStats]] = ContextVar(
+    "current_request_db", default=None
+)
+
+# Per SQL statement template: count, total_ms, max_ms. Past
+# DB_QUERY_TEMPLATES_MAX distinct templates, new ones are counted as OTHER.
+statements: dict[str, LabeledStats] = {}
+OTHER_STATEMENTS = "<other>"
+
+# Per (method, route template): requests, queries, queries_max, db_ms, total_ms
+route_db: dict[tuple[str, str], LabeledStats] = {}
+
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+_REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+
+
+@lru_cache(maxsize=1024)
+def statement_template(statement: str) -> str:
+    # Statements arrive parameterized already; fold what still varies between
+    # calls (placeholder style, IN list length, multi-row VALUES) so each
+    # query shape maps to one template
+    template = " ".join(statement.split())
+    template = _PLACEHOLDER.sub("?", template)
+    template = _IN_LIST.sub("IN (...)", template)
+    template = _REPEATED_ROWS.sub(r"\1, ...", template)
+    return template[:settings.DB_QUERY_TEMPLATE_LENGTH]
+
+
+def observe_query(statement: str, duration_ms: float) -> None:
+    template = statement_template(statement)
+    stats = statements.get(template)
+    if stats is None:
+        if len(statements) >= settings.DB_QUERY_TEMPLATES_MAX:
+            template = OTHER_STATEMENTS
+        stats = statements.get(template)
+        if stats is None:
+            stats = statements[template] = LabeledStats(f"query\t{template}")
+    stats.add("count", 1)
+    stats.add("total_ms", duration_ms)
+    stats.add("max_ms", duration_ms)
+    metrics["db_queries_total"] += 1
+    metrics["db_query_ms_total"] += duration_ms
+
+    request = current_request_db.get()
+    if request is not None:
+        request.queries += 1
+        request.db_ms += duration_ms
+
+
+def observe_request_db(method: str, route: str, request: RequestDBStats, latency_ms: float) -> None:
+    key = (method, route)
+    stats = route_db.get(key)
+    if stats is None:
+        stats = route_db[key] = LabeledStats(f"db\t{method}\t{route}")
+        stats.update(requests=0, queries=0, queries_max=0, db_ms=0, total_ms=0)
+    # Runs for every request, so the fields are updated in place rather than
+    # through add(); the merge rules are the same
+    stats["requests"] += 1
+    stats["queries"] += request.queries
+    if request.queries > stats["queries_max"]:
+        stats["queries_max"] = request.queries
+    stats["db_ms"] += request.db_ms
+    stats["total_ms"] += latency_ms
+    if worker_segment is not None:
+        stats.mirror()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _segment_alive(path: str) -> bool:
+    name = os.path.basename(path)[len("metrics_"):-len(".db")]
+    return not name.isdigit() or _pid_alive(int(name))
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else value
+
+
+def collect(directory: Optional[str] = None) -> tuple[dict, dict, dict]:
+    # Returns (values, latency histograms, database stats) for the whole
+    # server: merged from every worker segment in multi-process mode, this
+    # process otherwise
+    if directory is None:
+        if worker_segment is None:
+            db = {"statements": dict(statements), "routes": dict(route_db)}
+            return dict(metrics), dict(latency), db
+        directory = worker_segment.directory
+
+    values = {name: 0 for name in metrics}
+    histograms: dict[tuple[str, str, int], LatencyHistogram] = {}
+    db = {"statements": {}, "routes": {}}
+    for path in sorted(glob.glob(os.path.join(directory, "metrics_*.db"))):
+        alive = _segment_alive(path)
+        for key, value in read_segment(path):
+            if key in GAUGES and not alive:
+                continue
+            if key.startswith("latency\t"):
+                _, method, route, status_code, field = key.split("\t")
+                histogram = histograms.setdefault(
+                    (method, route, int(status_code)), LatencyHistogram()
+                )
+                if field == "sum":
+                    histogram.sum += value
+                elif field == "count":
+                    histogram.count += int(value)
+                else:
+                    histogram.counts[int(field)] += int(value)
+            elif key.startswith(("query\t", "db\t")):
+                kind, *labels, field = key.split("\t")
+                if kind == "query":
+                    stats = db["statements"].setdefault(labels[0], LabeledStats())
+                else:
+                    stats = db["routes"].setdefault(tuple(labels), LabeledStats())
+                stats.add(field, value)
+            elif key.endswith("_max"):
+                values[key] = max(values.get(key, 0), value)
+            else:
+                values[key] = values.get(key, 0) + value
+
+    values = {name: _number(value) for name, value in values.items()}
+    return values, histograms, db
+
+
+def latency_report(histograms: dict) -> dict:
+    overall = LatencyHistogram()
+    routes: dict[str, dict] = {}
+    for (method, route, status_code), histogram in sorted(histograms.items()):
+        overall.merge(histogram)
+        routes.setdefault(f"{method} {route}", {})[str(status_code)] = (
+            histogram.summary()
+        )
+    return {"overall": overall.summary(), "routes": routes}
+
+
+def db_report(db: dict, top: int = 20) -> dict:
+    # Per-route database time against total request time, and the statement
+    # templates that cost the most in total
+    # (another worker may be mid-way through writing a new entry's fields,
+    # hence .get)
+    routes = {}
+    for (method, route), stats in sorted(db["routes"].items()):
+        requests = stats.get("requests", 0) or 1
+        db_ms, total_ms = stats.get("db_ms", 0), stats.get("total_ms", 0)
+        routes[f"{method} {route}"] = {
+            "requests": _number(stats.get("requests", 0)),
+            "queries_per_request": round(stats.get("queries", 0) / requests, 2),
+            "max_queries_per_request": _number(stats.get("queries_max", 0)),
+            "avg_db_ms": round(db_ms / requests, 2),
+            "avg_total_ms": round(total_ms / requests, 2),
+            "db_time_ratio": round(db_ms / total_ms, 3) if total_ms else 0,
+        }
+
+    slowest = sorted(
+        db["statements"].items(),
+        key=lambda item: item[1].get("total_ms", 0),
+        reverse=True,
+    )
+    return {
+        "routes": routes,
+        "statements": [
+            {
+                "statement": template,
+                "count": _number(stats.get("count", 0)),
+                "total_ms": round(stats.get("total_ms", 0), 2),
+                "avg_ms": round(
+                    stats.get("total_ms", 0) / (stats.get("count", 0) or 1), 3
+                ),
+                "max_ms": round(stats.get("max_ms", 0), 3),
+            }
+            for template, stats in slowest[:top]
+        ],
+    }
+
+
+def _prometheus_labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def render_prometheus(values: dict, histograms: dict, db: dict, extra_gauges: dict[str, float]) -> str:
+    # Prometheus text exposition format 0.0.4
+    lines = []
+    for name, value in list(values.items()) + list(extra_gauges.items()):
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines.append(f"# TYPE sprintsync_{name} {kind}")
+        lines.append(f"sprintsync_{name} {value}")
+
+    name = "sprintsync_http_request_duration_seconds"
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route, status_code), histogram in sorted(histograms.items()):
+        labels = _prometheus_labels(method=method, route=route, status=status_code)
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum / 1000}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+    # Per-route database totals; statement templates stay on /metrics only,
+    # SQL text makes for unbounded label values
+    series = (
+        ("db_route_requests_total", "requests", 1),
+        ("db_route_queries_total", "queries", 1),
+        ("db_route_seconds_total", "db_ms", 1000),
+    )
+    for name, field, divisor in series:
+        lines.append(f"# TYPE sprintsync_{name} counter")
+        for (method, route), stats in sorted(db["routes"].items()):
+            labels = _prometheus_labels(method=method, route=route)
+            lines.append(f"sprintsync_{name}{{{labels}}} {stats.get(field, 0) / divisor}")
+    return "\n".join(lines) + "\n"
@@ -1,91 +1,252 @@
+import atexit
 import time
 import logging
 import json
+import queue
+import sys
 from datetime import datetime, timezone
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from jose import jwt, JWTError
+from json.encoder import encode_basestring_ascii
+from logging.handlers import QueueHandler, QueueListener
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.config import settings
+from app.metrics import (
+    RequestDBStats,
+    current_request_db,
+    metrics,
+    observe_request,
+    observe_request_db,
+)
 
-# Configure JSON logger
+
+# UTC timestamp down to the second, shared by every line logged within that
+# second; datetime.isoformat() per line costs nearly as much as json.dumps
+_second = (None, "")
+
+
+def format_timestamp(created: float) -> str:
+    global _second
+    second = int(created)
+    if _second[0] != second:
+        _second = (second, datetime.fromtimestamp(
+            second, timezone.utc
+        ).strftime("%Y-%m-%dT%H:%M:%S"))
+    return f"{_second[1]}.{int((created - second) * 1e6):06d}+00:00"
+
+
+# Access log lines always have the same fields, so they are rendered from a
+# template instead of through json.dumps; the output is the same JSON
+ACCESS_LINE = (
+    '{"timestamp": "%s", "method": %s, "path": %s, "user_id": %s, '
+    '"status_code": %d, "latency_ms": %.2f, "db_queries": %d, "db_ms": %.2f}'
+)
+
+
+def access_line(
+    created: float, method: str, path: str, user_id: str,
+    status_code: int, latency_ms: float, db_queries: int, db_ms: float,
+) -> str:
+    return ACCESS_LINE % (
+        format_timestamp(created),
+        encode_basestring_ascii(method),
+        encode_basestring_ascii(path),
+        encode_basestring_ascii(user_id),
+        status_code, latency_ms, db_queries, db_ms,
+    )
+
+
+# Renders dict messages as one JSON line. Runs on the listener thread, so
+# json.dumps and traceback formatting stay off the event loop.
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        if not isinstance(record.msg, dict):
+            return super().format(record)
+        line = json.dumps({
+            "timestamp": format_timestamp(record.created),
+            **record.msg,
+        })
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+# Hands records to the listener untouched; the stock QueueHandler would
+# format them on the calling thread
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# Writes to whatever sys.stderr is at emit time, not at import time (the
+# listener thread can outlive a redirected stream, e.g. under pytest)
+class StderrHandler(logging.StreamHandler):
+    def __init__(self):
+        super().__init__(None)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+# Collects formatted lines and writes them out together once the listener
+# has drained the queue (or `max_batch` lines are waiting), so a burst of
+# records costs one write instead of one per record
+class BatchingStderrHandler(StderrHandler):
+    def __init__(self, pending: queue.SimpleQueue, max_batch: int = 256):
+        super().__init__()
+        self.pending = pending
+        self.max_batch = max_batch
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.add_line(line)
+
+    def add_line(self, line: str) -> None:
+        self.lines.append(line)
+        if len(self.lines) >= self.max_batch or self.pending.empty():
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.lines:
+                self.stream.write(self.terminator.join(self.lines) + self.terminator)
+                self.lines.clear()
+            super().flush()
+
+
+# Its thread blocks on the queue while idle. Woken by a lone record, it
+# waits `linger` seconds for more before writing, so under steady traffic
+# it takes the GIL a few times a second instead of once per request.
+class LogQueueListener(QueueListener):
+    def __init__(self, queue, *handlers, linger: float = 0.0, **kwargs):
+        super().__init__(queue, *handlers, **kwargs)
+        self.linger = linger
+
+    def dequeue(self, block):
+        record = self.queue.get(block)
+        if block and self.linger and self.queue.empty():
+            time.sleep(self.linger)
+        return record
+
+    def handle(self, record):
+        # Access log entries arrive as plain tuples; see log_access. They
+        # skip LogRecord creation and the handler's filter and lock round
+        # trip: the line is rendered once and added to the batch.
+        if isinstance(record, tuple):
+            line = access_line(*record)
+            for handler in self.handlers:
+                handler.add_line(line)
+            return
+        super().handle(record)
+
+
+# Configure JSON logger: request handlers only enqueue records, a background
+# thread writes them out
 logger = logging.getLogger("sprintsync")
 logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(message)s"))
-logger.addHandler(handler)
-
-# In-memory metrics store
-metrics = {
-    "http_requests_total": 0,
-    "errors_total": 0,
-    "ai_suggest_calls_total": 0,
-    "total_latency_ms": 0,
-    "routes": {},
-}
-
-
-def extract_user_id(request: Request) -> str:
-    try:
-        auth = request.headers.get("Authorization", "")
-        if not auth.startswith("Bearer "):
-            return "anonymous"
-        token = auth.split(" ")[1]
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-        return payload.get("sub", "anonymous")
-    except JWTError:
+log_queue = queue.SimpleQueue()
+handler = BatchingStderrHandler(log_queue)
+handler.setFormatter(JsonFormatter("%(message)s"))
+log_listener = LogQueueListener(
+    log_queue, handler, linger=settings.LOG_BATCH_SECONDS, respect_handler_level=True
+)
+logger.addHandler(DeferredQueueHandler(log_queue))
+log_listener.start()
+
+
+@atexit.register
+def stop_logging() -> None:
+    log_listener.stop()
+    # The last batch may still be waiting behind the stop sentinel
+    handler.flush()
+
+
+def log_access(
+    method: str, path: str, user_id: str,
+    status_code: int, latency_ms: float, db_queries: int, db_ms: float,
+) -> None:
+    # Hot path for per-request logs: only a tuple is enqueued. The listener
+    # thread renders it (see access_line), rounding included.
+    if logger.isEnabledFor(logging.INFO):
+        log_queue.put_nowait((
+            time.time(), method, path, user_id,
+            status_code, latency_ms, db_queries, db_ms,
+        ))
+
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", "<unmatched>")
+
+
+def extract_user_id(scope: Scope) -> str:
+    # Reuses the payload get_current_user stashed on request.state (see
+    # app/security.py) instead of verifying the token again
+    payload = scope.get("state", {}).get("token_payload")
+    if payload is None:
         return "anonymous"
+    return payload.get("sub", "anonymous")
+
 
+class LoggingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
         t1 = time.perf_counter()
-        user_id = extract_user_id(request)
         status_code = 500
+        db_stats = RequestDBStats(scope["method"], scope["path"])
+        token = current_request_db.set(db_stats)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            response: Response = await call_next(request)
-            status_code = response.status_code
-            return response
+            await self.app(scope, receive, send_wrapper)
 
         except Exception as exc:
-            metrics["errors_total"] += 1
-            logger.exception(
-                json.dumps({
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "method": request.method,
-                    "path": request.url.path,
-                    "user_id": user_id,
-                    "status_code": 500,
-                    "error": str(exc),
-                })
-            )
+            logger.exception({
+                "method": scope["method"],
+                "path": scope["path"],
+                "user_id": extract_user_id(scope),
+                "status_code": 500,
+                "error": str(exc),
+            })
             raise
 
         finally:
-            latency_ms = round((time.perf_counter() - t1) * 1000, 2)
-            route_key = f"{request.method} {request.url.path}"
+            latency_ms = (time.perf_counter() - t1) * 1000
+            current_request_db.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
 
             # Update metrics
             metrics["http_requests_total"] += 1
-            metrics["total_latency_ms"] += latency_ms
-            metrics["routes"][route_key] = (
-                metrics["routes"].get(route_key, 0) + 1
-            )
-            if request.url.path == "/ai/suggest":
+            metrics["http_request_latency_ms_total"] += latency_ms
+            observe_request(method, route, status_code, latency_ms)
+            observe_request_db(method, route, db_stats, latency_ms)
+            if route == "/ai/suggest":
                 metrics["ai_suggest_calls_total"] += 1
             if status_code >= 500:
                 metrics["errors_total"] += 1
 
             # Emit structured log
-            logger.info(json.dumps({
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "method": request.method,
-                "path": request.url.path,
-                "user_id": user_id,
-                "status_code": status_code,
-                "latency_ms": latency_ms,
-            }))
\ No newline at end of file
+            log_access(
+                method, scope["path"], extract_user_id(scope), status_code,
+                latency_ms, db_stats.queries, db_stats.db_ms,
+            )
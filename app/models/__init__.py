@@ -1,2 +1,6 @@
 from app.models.user import User
-from app.models.task import Task
\ No newline at end of file
+from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
+from app.models.task_rollup import TaskStatusRollup, TaskDailyRollup
+from app.models.time_entry import TimeEntry
+from app.models.task_status_change import TaskStatusChange
\ No newline at end of file
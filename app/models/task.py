@@ -1,24 +1,105 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import (
+    Column, String, Integer, DateTime, ForeignKey, Text, Index, CheckConstraint, DDL, event,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+from datetime import datetime, timezone
 from app.database import Base
+from app.models.types import UUIDString
+
+TASK_STATUSES = ("todo", "in_progress", "done")
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), see GET /tasks/
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index(
+            "ix_tasks_owner_id_status_created_at_id",
+            "owner_id", "status", "created_at", "id",
+        ),
+        # Admin list filtered by status
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+        # Change feed on (updated_at, id), see GET /tasks/changes
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+        CheckConstraint(
+            "status IN (%s)" % ", ".join(f"'{status}'" for status in TASK_STATUSES),
+            name="ck_tasks_status",
+        ),
+    )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(String(20), nullable=False, default="todo")
     total_minutes = Column(Integer, default=0)
-    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    owner_id = Column(UUIDString, ForeignKey("users.id"), nullable=False)
+    # Bumped by every write; served as the ETag for optimistic concurrency
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+    )
+    # Set on insert too, so every row has a place in the change feed
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+    )
 
     # Relationship back to user
     owner = relationship("User", back_populates="tasks")
 
     def __repr__(self):
-        return f"<Task {self.title} [{self.status}]>"
\ No newline at end of file
+        return f"<Task {self.title} [{self.status}]>"
+
+
+# Full-text search for GET /tasks/search. On Postgres a generated tsvector
+# column with a GIN index (also created by migration 2b5d0e7c9a41); on SQLite
+# an FTS5 table over title and description kept current by triggers. Neither
+# is mapped on Task, so ORM queries never load them.
+SEARCH_LANGUAGE = "english"
+
+SEARCH_DDL = {
+    "postgresql": [
+        f"""ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(description, '')), 'B')
+        ) STORED""",
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='rowid'
+        )""",
+        """CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END""",
+        """CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END""",
+        """CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END""",
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(
+    Task.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
\ No newline at end of file
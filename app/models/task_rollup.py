@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, Date, Index
+from app.database import Base
+from app.models.types import UUIDString
+
+
+# Aggregates behind GET /analytics/summary, kept current by the task write
+# handlers (see app/services/task_rollups.py) instead of scanning tasks
+class TaskStatusRollup(Base):
+    __tablename__ = "task_status_rollups"
+
+    owner_id = Column(UUIDString, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TaskStatusRollup {self.owner_id} [{self.status}]>"
+
+
+class TaskDailyRollup(Base):
+    __tablename__ = "task_daily_rollups"
+    __table_args__ = (
+        Index("ix_task_daily_rollups_owner_id_day", "owner_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)  # UTC
+    owner_id = Column(UUIDString, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TaskDailyRollup {self.owner_id} {self.day}>"
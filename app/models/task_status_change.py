@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index
+from app.database import Base
+from app.models.types import UUIDString
+
+
+# One row per status transition, written in the same transaction as the
+# task change (see app/services/task_rollups.py). Creation is recorded as a
+# transition from None. Read by GET /analytics/cycle-time.
+class TaskStatusChange(Base):
+    __tablename__ = "task_status_history"
+    __table_args__ = (
+        # Completions in a date range, for everyone or for one owner
+        Index("ix_task_status_history_to_status_changed_at", "to_status", "changed_at"),
+        Index(
+            "ix_task_status_history_owner_id_to_status_changed_at",
+            "owner_id", "to_status", "changed_at",
+        ),
+        Index("ix_task_status_history_task_id_changed_at", "task_id", "changed_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    task_id = Column(UUIDString, nullable=False)
+    owner_id = Column(UUIDString, nullable=False)
+    from_status = Column(String(20), nullable=True)
+    to_status = Column(String(20), nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<TaskStatusChange {self.task_id} {self.from_status}->{self.to_status}>"
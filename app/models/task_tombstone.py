@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+from app.models.types import UUIDString
+
+
+# Left behind by DELETE /tasks/{task_id} so GET /tasks/changes can report
+# deletions; pruned after TASK_TOMBSTONE_RETENTION_DAYS
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_deleted_at_task_id", "deleted_at", "task_id"),
+        Index(
+            "ix_task_tombstones_owner_id_deleted_at_task_id",
+            "owner_id", "deleted_at", "task_id",
+        ),
+    )
+
+    task_id = Column(UUIDString, primary_key=True)
+    owner_id = Column(UUIDString, nullable=False)
+    deleted_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    def __repr__(self):
+        return f"<TaskTombstone {self.task_id}>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, DateTime, Boolean, Index, false, text
+from app.database import Base
+from app.models.types import UUIDString
+
+
+# Append-only log behind POST /tasks/{task_id}/time. Entries are folded into
+# Task.total_minutes by compaction (see app/services/time_log.py) and marked
+# compacted; the rows stay as the task's time history.
+class TimeEntry(Base):
+    __tablename__ = "time_entries"
+    __table_args__ = (
+        Index("ix_time_entries_task_id_logged_at", "task_id", "logged_at"),
+        # Only the entries compaction has yet to fold in
+        Index(
+            "ix_time_entries_pending", "id",
+            postgresql_where=text("NOT compacted"),
+            sqlite_where=text("compacted = 0"),
+        ),
+    )
+
+    id = Column(UUIDString, primary_key=True)
+    # No foreign key: entries buffered for a task deleted before the flush
+    # must not fail the rest of the batch
+    task_id = Column(UUIDString, nullable=False)
+    user_id = Column(UUIDString, nullable=False)
+    minutes = Column(Integer, nullable=False)
+    logged_at = Column(DateTime(timezone=True), nullable=False)
+    compacted = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    def __repr__(self):
+        return f"<TimeEntry {self.task_id} +{self.minutes}m>"
@@ -0,0 +1,27 @@
+import uuid
+from sqlalchemy import String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+# Ids are UUID strings throughout the app. Postgres stores them as its native
+# 16-byte uuid type; other databases (SQLite in tests) keep the text form.
+class UUIDString(TypeDecorator):
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        # Ids arrive from paths, query strings and cursors. Text that is not
+        # a UUID can never match a stored id, but Postgres rejects it with an
+        # error instead, so it is bound as NULL, which matches nothing either.
+        if value is None or dialect.name != "postgresql":
+            return value
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            return None
@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Depends
-from app.schemas.ai import AISuggestRequest, AISuggestResponse
-from app.services.ai_service import generate_suggestion
+from app.schemas.ai import (
+    AISuggestRequest,
+    AISuggestResponse,
+    AISuggestBatchRequest,
+    AISuggestBatchResponse,
+)
+from app.services.ai_service import generate_suggestion, generate_suggestions
 from app.dependencies import get_current_user
 from app.models.user import User
 
@@ -13,4 +18,15 @@ async def ai_suggest(
     current_user: User = Depends(get_current_user),
 ):
     result = await generate_suggestion(body.title)
-    return AISuggestResponse(**result)
\ No newline at end of file
+    return AISuggestResponse(**result)
+
+
+@router.post("/suggest/batch", response_model=AISuggestBatchResponse)
+async def ai_suggest_batch(
+    body: AISuggestBatchRequest,
+    current_user: User = Depends(get_current_user),
+):
+    results = await generate_suggestions([item.title for item in body.items])
+    return AISuggestBatchResponse(
+        items=[AISuggestResponse(**result) for result in results]
+    )
\ No newline at end of file
@@ -0,0 +1,217 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Float, case, func, literal_column, select, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from app.database import get_db
+from app.models.task_rollup import TaskDailyRollup, TaskStatusRollup
+from app.models.task_status_change import TaskStatusChange
+from app.models.user import User
+from app.schemas.analytics import (
+    AnalyticsSummary,
+    CycleTimeReport,
+    DailyThroughput,
+    DurationStats,
+    OwnerCycleTime,
+    OwnerTotals,
+    StatusTotals,
+)
+from app.dependencies import get_current_user
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+PERCENTILES = (50, 85, 95)
+
+
+class seconds_between(FunctionElement):
+    # seconds_between(end, start): end - start in seconds
+    type = Float()
+    name = "seconds_between"
+    inherit_cache = True
+
+
+@compiles(seconds_between)
+def _seconds_between(element, compiler, **kw):
+    end, start = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f"EXTRACT(EPOCH FROM ({end} - {start}))"
+
+
+@compiles(seconds_between, "sqlite")
+def _seconds_between_sqlite(element, compiler, **kw):
+    end, start = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f"((julianday({end}) - julianday({start})) * 86400.0)"
+
+
+def date_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    # Inclusive UTC days, the last DEFAULT_RANGE_DAYS unless given
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days"
+        )
+    return start, end
+
+
+@router.get("/summary", response_model=AnalyticsSummary)
+async def get_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    owner_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Task counts and minutes per owner and status, and tasks created and
+    # completed per day. Both come from the rollup tables the task handlers
+    # maintain, so the cost does not grow with the number of tasks.
+    start, end = date_range(start, end)
+    statuses = select(TaskStatusRollup).where(TaskStatusRollup.task_count > 0)
+    days = select(
+        TaskDailyRollup.day,
+        func.sum(TaskDailyRollup.created).label("created"),
+        func.sum(TaskDailyRollup.completed).label("completed"),
+    ).where(TaskDailyRollup.day.between(start, end))
+    owners = [] if current_user.is_admin else [current_user.id]
+    if owner_id is not None:
+        owners.append(owner_id)
+    for owner in owners:
+        statuses = statuses.where(TaskStatusRollup.owner_id == owner)
+        days = days.where(TaskDailyRollup.owner_id == owner)
+
+    rows = (await db.execute(
+        statuses.order_by(TaskStatusRollup.owner_id, TaskStatusRollup.status)
+    )).scalars().all()
+    daily = {
+        row.day: row
+        for row in (await db.execute(days.group_by(TaskDailyRollup.day))).all()
+    }
+
+    by_owner: dict[str, OwnerTotals] = {}
+    by_status: dict[str, int] = {}
+    for row in rows:
+        totals = by_owner.setdefault(row.owner_id, OwnerTotals(
+            owner_id=row.owner_id, task_count=0, total_minutes=0, by_status={}
+        ))
+        totals.task_count += row.task_count
+        totals.total_minutes += row.total_minutes
+        totals.by_status[row.status] = row.task_count
+        by_status[row.status] = by_status.get(row.status, 0) + row.task_count
+
+    # Every day in the range, zeros included, so charts need no gap filling
+    throughput = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = daily.get(day)
+        throughput.append(DailyThroughput(
+            day=day,
+            created=row.created if row else 0,
+            completed=row.completed if row else 0,
+        ))
+
+    return AnalyticsSummary(
+        start=start,
+        end=end,
+        by_owner_status=[
+            StatusTotals(
+                owner_id=row.owner_id,
+                status=row.status,
+                task_count=row.task_count,
+                total_minutes=row.total_minutes,
+            )
+            for row in rows
+        ],
+        by_owner=list(by_owner.values()),
+        by_status=by_status,
+        total_minutes=sum(row.total_minutes for row in rows),
+        throughput=throughput,
+    )
+
+
+@router.get("/cycle-time", response_model=CycleTimeReport)
+async def get_cycle_time(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    owner_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Lead time (created -> done) and cycle time (first in_progress -> done)
+    # of the tasks completed between start and end, per owner, from the
+    # status history. The percentiles are nearest-rank over ROW_NUMBER()
+    # within each (owner, metric), so the whole report is one query that
+    # runs the same on Postgres and SQLite.
+    start, end = date_range(start, end)
+    history = TaskStatusChange
+    completed = select(
+        history.task_id,
+        history.owner_id,
+        func.max(history.changed_at).label("done_at"),
+    ).where(
+        history.to_status == "done",
+        history.changed_at >= datetime.combine(start, time(), timezone.utc),
+        history.changed_at < datetime.combine(end + timedelta(days=1), time(), timezone.utc),
+    ).group_by(history.task_id, history.owner_id)
+    owners = [] if current_user.is_admin else [current_user.id]
+    if owner_id is not None:
+        owners.append(owner_id)
+    for owner in owners:
+        completed = completed.where(history.owner_id == owner)
+    completed = completed.cte("completed")
+
+    milestones = select(
+        history.task_id,
+        func.min(case((history.from_status.is_(None), history.changed_at))).label("created_at"),
+        func.min(case((history.to_status == "in_progress", history.changed_at))).label("started_at"),
+    ).where(
+        history.task_id.in_(select(completed.c.task_id))
+    ).group_by(history.task_id).cte("milestones")
+
+    durations = union_all(*(
+        select(
+            completed.c.owner_id,
+            literal_column(f"'{metric}'").label("metric"),
+            seconds_between(completed.c.done_at, milestone).label("seconds"),
+        )
+        .join_from(completed, milestones, completed.c.task_id == milestones.c.task_id)
+        .where(milestone.is_not(None))
+        for metric, milestone in (
+            ("lead_time", milestones.c.created_at),
+            ("cycle_time", milestones.c.started_at),
+        )
+    )).cte("durations")
+
+    partition = (durations.c.owner_id, durations.c.metric)
+    ranked = select(
+        durations,
+        func.row_number().over(partition_by=partition, order_by=durations.c.seconds).label("rank"),
+        func.count().over(partition_by=partition).label("n"),
+    ).cte("ranked")
+    # Nearest rank of percentile p among n values: ceil(n * p / 100)
+    report = select(
+        ranked.c.owner_id,
+        ranked.c.metric,
+        func.max(ranked.c.n).label("count"),
+        func.avg(ranked.c.seconds).label("avg"),
+        *(
+            func.max(case(
+                (ranked.c.rank == (ranked.c.n * p + 99) // 100, ranked.c.seconds)
+            )).label(f"p{p}")
+            for p in PERCENTILES
+        ),
+    ).group_by(ranked.c.owner_id, ranked.c.metric).order_by(ranked.c.owner_id)
+
+    by_owner: dict[str, OwnerCycleTime] = {}
+    for row in (await db.execute(report)).all():
+        owner = by_owner.setdefault(row.owner_id, OwnerCycleTime(owner_id=row.owner_id))
+        setattr(owner, row.metric, DurationStats(
+            count=row.count,
+            avg_hours=round(row.avg / 3600, 3),
+            **{f"p{p}_hours": round(row._mapping[f"p{p}"] / 3600, 3) for p in PERCENTILES},
+        ))
+    return CycleTimeReport(start=start, end=end, owners=list(by_owner.values()))
@@ -8,17 +8,18 @@ from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, LoginRequest, TokenResponse
 from app.config import settings
+from app.services.hash_pool import run_in_hash_pool
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await run_in_hash_pool(pwd_context.hash, password)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await run_in_hash_pool(pwd_context.verify, plain, hashed)
 
 
 def create_access_token(user_id: str) -> str:
@@ -41,7 +42,7 @@ async def register(body: UserCreate, db: AsyncSession = Depends(get_db)):
 
     user = User(
         email=body.email,
-        hashed_password=hash_password(body.password),
+        hashed_password=await hash_password(body.password),
     )
     db.add(user)
     await db.flush()
@@ -55,7 +56,7 @@ async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.hashed_password):
+    if not user or not await verify_password(body.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
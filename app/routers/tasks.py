@@ -1,11 +1,47 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.database import get_db
-from app.models.task import Task
+from sqlalchemy import (
+    Float, and_, column, delete, func, insert, literal_column, or_, select, table,
+    tuple_, update,
+)
+from sqlalchemy.orm import aliased, sessionmaker
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pydantic import TypeAdapter
+from typing import Literal, Optional
+import base64
+import re
+import uuid
+from app.config import settings
+from app.database import get_db, get_session_factory
+from app.models.task import SEARCH_LANGUAGE, Task
+from app.models.task_tombstone import TaskTombstone
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskUpdate, TaskStatusUpdate, TaskResponse
-from app.dependencies import get_current_user
+from app.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    TaskStatusUpdate,
+    TaskResponse,
+    TaskPartialResponse,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkStatusUpdate,
+    TaskBulkResult,
+    TaskBulkResponse,
+    TaskChangesResponse,
+    TaskTombstoneResponse,
+    StreamTicketResponse,
+    TimeEntryCreate,
+    TimeEntryResponse,
+)
+from app.dependencies import get_current_user, get_stream_user
+from app.security import create_stream_ticket
+from app.services.export_service import export_response
+from app.services.task_events import commit_changes, task_event, task_events
+from app.services.task_rollups import TaskRollups
+from app.services.task_versions import task_list_cache, task_versions
+from app.services.time_log import time_log
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
@@ -14,106 +50,813 @@ TRANSITIONS = {
     "todo": "in_progress",
     "in_progress": "done",
 }
+# The status a task must be in to move to a given status
+PREVIOUS_STATUS = {new: old for old, new in TRANSITIONS.items()}
+
+# Words of a search query; each must appear in the title or description
+SEARCH_TERM = re.compile(r"\w+")
+
+# GET /tasks/ pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+TASK_LIST = TypeAdapter(list[TaskPartialResponse])
+
+
+# Sorts before every real id; the id half of a cursor that has no row to point at
+MIN_ID = str(uuid.UUID(int=0))
+
+
+def encode_cursor(created_at: datetime, task_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, task_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_search_cursor(score: float, task_id: str) -> str:
+    raw = f"{score!r}|{task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        score, task_id = raw.split("|", 1)
+        return float(score), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back without a timezone; they are stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def transition_error(current: str, requested: str) -> Optional[str]:
+    allowed_next = TRANSITIONS.get(current)
+    if requested != allowed_next:
+        return f"Invalid transition: '{current}' → '{requested}'. Expected '{allowed_next}'"
+    return None
+
+
+def task_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    # The version a write is conditional on; None when absent or "*"
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=412, detail="If-Match does not match")
+    return int(value)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime,
+) -> bool:
+    # If-Modified-Since only counts when there is no If-None-Match
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # `since` has whole seconds: a change anywhere after it, even within
+    # the same second, counts as modified
+    return last_modified <= since
+
+
+def last_modified_date(last_modified: datetime, now: Optional[datetime] = None) -> datetime:
+    # Last-Modified has whole seconds. Rounding the change up to the next
+    # second lets a revalidation match it, but not past the current second:
+    # a write later in this second would otherwise fall before the date the
+    # client sends back and the list would look unmodified
+    now = now or datetime.now(timezone.utc)
+    rounded = last_modified.replace(microsecond=0)
+    if rounded < last_modified:
+        rounded += timedelta(seconds=1)
+    return min(rounded, now.replace(microsecond=0))
+
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    if not fields:
+        return TASK_FIELDS
+    selected = tuple(dict.fromkeys(
+        name.strip() for name in fields.split(",") if name.strip()
+    ))
+    unknown = [name for name in selected if name not in TASK_FIELDS]
+    if not selected or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(TASK_FIELDS)}",
+        )
+    return selected
 
 
 @router.post("/", response_model=TaskResponse, status_code=201)
 async def create_task(
     body: TaskCreate,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     task = Task(**body.model_dump(), owner_id=current_user.id)
     db.add(task)
     await db.flush()
+    rollups = TaskRollups()
+    rollups.created(task.id, task.owner_id, task.status, task.total_minutes, task.created_at)
+    await rollups.apply(db)
+    await commit_changes(db, [task_event("created", task)])
+    response.headers["ETag"] = task_etag(task.version)
     return task
 
 
-@router.get("/", response_model=list[TaskResponse])
+@router.get(
+    "/",
+    response_model=list[TaskPartialResponse],
+    response_model_exclude_unset=True,
+)
 async def get_tasks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    query = select(Task)
+    # The version is read before the rows, so a write that lands in between
+    # leaves this response under the old version
+    etag, last_modified = await task_versions.validators(current_user)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified_date(last_modified), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    cache_key = (etag, tuple(sorted(request.query_params.multi_items())))
+    cached = task_list_cache.get(cache_key)
+    if cached is None:
+        cached = await list_tasks(
+            db, current_user, limit, cursor, status, owner_id,
+            created_after, created_before, fields,
+        )
+        task_list_cache.set(cache_key, cached)
+
+    body, next_cursor = cached
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def list_tasks(
+    db: AsyncSession,
+    current_user: User,
+    limit: int,
+    cursor: Optional[str],
+    status: Optional[str],
+    owner_id: Optional[str],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime],
+    fields: Optional[str],
+) -> tuple[bytes, Optional[str]]:
+    # Returns the serialized page and the next cursor
+    selected = parse_fields(fields)
+
+    # created_at and id are always loaded to build the next cursor
+    columns = dict.fromkeys([*selected, "created_at", "id"])
+    query = select(*(getattr(Task, name) for name in columns))
+
     if not current_user.is_admin:
         query = query.where(Task.owner_id == current_user.id)
-    result = await db.execute(query)
-    return result.scalars().all()
+    if owner_id is not None:
+        query = query.where(Task.owner_id == owner_id)
+    if status is not None:
+        query = query.where(Task.status == status)
+    if created_after is not None:
+        query = query.where(Task.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Task.created_at < created_before)
+    if cursor is not None:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Task.created_at, Task.id) > (after_created_at, after_id)
+        )
 
+    # Fetch one extra row to know whether there is a next page
+    query = query.order_by(Task.created_at, Task.id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
 
-@router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(
-    task_id: str,
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    tasks = TASK_LIST.validate_python(
+        [{name: row._mapping[name] for name in selected} for row in rows]
+    )
+    return TASK_LIST.dump_json(tasks, exclude_unset=True), next_cursor
+
+
+@router.get("/export")
+async def export_tasks(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(get_current_user),
+):
+    query = select(*(getattr(Task, name) for name in TASK_FIELDS)).order_by(
+        Task.created_at, Task.id
+    )
+    if not current_user.is_admin:
+        query = query.where(Task.owner_id == current_user.id)
+    return export_response(session_factory, query, export_format, "tasks")
+
+
+@router.get("/search", response_model=list[TaskResponse])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Tasks whose title or description contain every word of `q`, best match
+    # first (title matches weigh more). Paged like GET /tasks/: pass
+    # X-Next-Cursor back as ?cursor=.
+    terms = SEARCH_TERM.findall(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+
+    columns = [getattr(Task, name) for name in TASK_FIELDS]
+    if db.bind.dialect.name == "postgresql":
+        vector = literal_column("tasks.search_vector")
+        tsquery = func.plainto_tsquery(SEARCH_LANGUAGE, " ".join(terms))
+        # Double precision, so the score round-trips through the cursor
+        score = func.ts_rank_cd(vector, tsquery).cast(Float)
+        query = select(*columns, score.label("score")).where(vector.op("@@")(tsquery))
+    else:
+        fts = table("tasks_fts", column("rowid"))
+        fts_row = literal_column("tasks_fts")
+        # bm25() is lower for better matches; title weighted over description
+        score = -func.bm25(fts_row, 2.0, 1.0)
+        query = select(*columns, score.label("score")).select_from(Task).join(
+            fts, fts.c.rowid == literal_column("tasks.rowid")
+        ).where(fts_row.op("MATCH")(" ".join(f'"{term}"' for term in terms)))
+
+    if not current_user.is_admin:
+        query = query.where(Task.owner_id == current_user.id)
+    if owner_id is not None:
+        query = query.where(Task.owner_id == owner_id)
+    if status is not None:
+        query = query.where(Task.status == status)
+
+    ranked = query.subquery()
+    page = select(ranked)
+    if cursor is not None:
+        after_score, after_id = decode_search_cursor(cursor)
+        page = page.where(or_(
+            ranked.c.score < after_score,
+            and_(ranked.c.score == after_score, ranked.c.id > after_id),
+        ))
+    rows = (await db.execute(
+        page.order_by(ranked.c.score.desc(), ranked.c.id).limit(limit + 1)
+    )).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_search_cursor(
+            rows[-1].score, rows[-1].id
+        )
+    return [{name: row._mapping[name] for name in TASK_FIELDS} for row in rows]
+
+
+@router.get("/changes", response_model=TaskChangesResponse)
+async def get_task_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Tasks created, updated or deleted after `since`, oldest first. Clients
+    # store the returned cursor and pass it back as `since`; without one the
+    # feed starts from the beginning. Rows are ordered by (updated_at, id) for
+    # tasks and (deleted_at, task_id) for tombstones, and both are paged
+    # together on that key.
+    now = datetime.now(timezone.utc)
+    # A write is stamped before its transaction commits, so a row can appear
+    # with a timestamp older than rows already served. Rows inside the settle
+    # window are left for the next call, by which time those commits are in.
+    settled = now - timedelta(seconds=settings.TASK_CHANGES_SETTLE_SECONDS)
+    retention = timedelta(days=settings.TASK_TOMBSTONE_RETENTION_DAYS)
+
+    tasks_query = select(Task).where(Task.updated_at < settled)
+    tombstones_query = select(TaskTombstone).where(TaskTombstone.deleted_at < settled)
+    if not current_user.is_admin:
+        tasks_query = tasks_query.where(Task.owner_id == current_user.id)
+        tombstones_query = tombstones_query.where(
+            TaskTombstone.owner_id == current_user.id
+        )
+    if since is not None:
+        after = decode_cursor(since)
+        if not after[1]:
+            # Older cursors carry "", which a uuid column cannot compare with
+            after = (after[0], MIN_ID)
+        # Tombstones older than the retention period are gone, so deletions
+        # since then can no longer be reported
+        if as_utc(after[0]) < now - retention:
+            raise HTTPException(status_code=410, detail="Cursor expired")
+        tasks_query = tasks_query.where(tuple_(Task.updated_at, Task.id) > after)
+        tombstones_query = tombstones_query.where(
+            tuple_(TaskTombstone.deleted_at, TaskTombstone.task_id) > after
+        )
+
+    # One extra row from each side is enough to know whether more remain
+    tasks = (await db.execute(
+        tasks_query.order_by(Task.updated_at, Task.id).limit(limit + 1)
+    )).scalars().all()
+    tombstones = (await db.execute(
+        tombstones_query.order_by(TaskTombstone.deleted_at, TaskTombstone.task_id)
+        .limit(limit + 1)
+    )).scalars().all()
+
+    entries = sorted(
+        [(task.updated_at, task.id, task) for task in tasks]
+        + [(tombstone.deleted_at, tombstone.task_id, None) for tombstone in tombstones],
+        key=lambda entry: (entry[0], entry[1]),
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if has_more:
+        cursor = encode_cursor(entries[-1][0], entries[-1][1])
+    else:
+        # Everything before the settle window has been served, so the next
+        # call can start there even if nothing changed
+        cursor = encode_cursor(settled, MIN_ID)
+
+    return TaskChangesResponse(
+        changed=[task for _, _, task in entries if task is not None],
+        deleted=[
+            TaskTombstoneResponse(id=task_id, deleted_at=deleted_at)
+            for deleted_at, task_id, task in entries if task is None
+        ],
+        cursor=cursor,
+        has_more=has_more,
+    )
+
+
+@router.get("/stream")
+async def stream_tasks(current_user: User = Depends(get_stream_user)):
+    # Server-Sent Events: ready, created, updated, status, deleted, resync
+    return StreamingResponse(
+        task_events.stream(current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/stream/ticket", response_model=StreamTicketResponse)
+async def create_task_stream_ticket(current_user: User = Depends(get_current_user)):
+    # Exchanged for the JWT right before opening GET /tasks/stream?ticket=
+    return {
+        "ticket": create_stream_ticket(current_user.id),
+        "expires_in": settings.TASK_STREAM_TICKET_SECONDS,
+    }
+
+
+async def load_tasks(db: AsyncSession, task_ids: list[str]) -> dict[str, dict]:
+    # All targets of a bulk request in one IN query, locked until commit so
+    # the values the request builds on (and its rollup deltas) stay current
+    query = select(*(getattr(Task, name) for name in TASK_FIELDS)).where(
+        Task.id.in_(set(task_ids))
+    ).with_for_update()
+    return {row.id: dict(row._mapping) for row in (await db.execute(query)).all()}
+
+
+def access_error(task: Optional[dict], task_id: str, user: User) -> Optional[TaskBulkResult]:
+    if task is None:
+        return TaskBulkResult(id=task_id, status_code=404, detail="Task not found")
+    if task["owner_id"] != user.id and not user.is_admin:
+        return TaskBulkResult(id=task_id, status_code=403, detail="Not your task")
+    return None
+
+
+@router.post("/bulk", response_model=TaskBulkResponse, status_code=201)
+async def bulk_create_tasks(
+    body: TaskBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            **item.model_dump(),
+            "id": str(uuid.uuid4()),
+            "owner_id": current_user.id,
+            "version": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for item in body.items
+    ]
+    # One multi-row INSERT; every row carries the same keys
+    await db.execute(insert(Task).values(rows))
+    rollups = TaskRollups()
+    for row in rows:
+        rollups.created(row["id"], row["owner_id"], row["status"], row["total_minutes"], now)
+    await rollups.apply(db)
+    await commit_changes(db, [task_event("created", row) for row in rows])
+    return TaskBulkResponse(items=[
+        TaskBulkResult(id=row["id"], status_code=201, task=TaskResponse(**row))
+        for row in rows
+    ])
+
+
+@router.patch("/bulk", response_model=TaskBulkResponse)
+async def bulk_update_tasks(
+    body: TaskBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    tasks = await load_tasks(db, [item.id for item in body.items])
+    minutes_before = {task_id: task["total_minutes"] for task_id, task in tasks.items()}
+    now = datetime.now(timezone.utc)
+    results, changed = [], {}
+    # Items apply in order, so repeated ids see the earlier changes
+    for item in body.items:
+        task = tasks.get(item.id)
+        error = access_error(task, item.id, current_user)
+        if error:
+            results.append(error)
+            continue
+        for name in ("title", "description", "total_minutes"):
+            value = getattr(item, name)
+            if value is not None:
+                task[name] = value
+        task["updated_at"] = now
+        if item.id not in changed:
+            task["version"] += 1
+        changed[item.id] = task
+        results.append(TaskBulkResult(
+            id=item.id, status_code=200, task=TaskResponse(**task)
+        ))
+
+    if changed:
+        await db.execute(update(Task), [
+            {
+                "id": task["id"],
+                "title": task["title"],
+                "description": task["description"],
+                "total_minutes": task["total_minutes"],
+                "version": task["version"],
+                "updated_at": now,
+            }
+            for task in changed.values()
+        ])
+        rollups = TaskRollups()
+        for task in changed.values():
+            rollups.add(
+                task["owner_id"], task["status"], 0,
+                (task["total_minutes"] or 0) - (minutes_before[task["id"]] or 0),
+            )
+        await rollups.apply(db)
+        await commit_changes(
+            db, [task_event("updated", task) for task in changed.values()]
+        )
+    return TaskBulkResponse(items=results)
+
+
+@router.patch("/bulk/status", response_model=TaskBulkResponse)
+async def bulk_update_status(
+    body: TaskBulkStatusUpdate,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    tasks = await load_tasks(db, [item.id for item in body.items])
+    now = datetime.now(timezone.utc)
+    results, changed = [], {}
+    # Each step is recorded, so a task moved twice in one request keeps
+    # both transitions in its history
+    rollups = TaskRollups()
+    for item in body.items:
+        task = tasks.get(item.id)
+        error = access_error(task, item.id, current_user)
+        if error:
+            results.append(error)
+            continue
+        detail = transition_error(task["status"], item.status)
+        if detail:
+            results.append(TaskBulkResult(id=item.id, status_code=400, detail=detail))
+            continue
+        rollups.moved(
+            task["id"], task["owner_id"], task["status"], item.status,
+            task["total_minutes"], now,
+        )
+        task["status"] = item.status
+        task["updated_at"] = now
+        if item.id not in changed:
+            task["version"] += 1
+        changed[item.id] = task
+        results.append(TaskBulkResult(
+            id=item.id, status_code=200, task=TaskResponse(**task)
+        ))
+
+    if changed:
+        await db.execute(update(Task), [
+            {
+                "id": task["id"],
+                "status": task["status"],
+                "version": task["version"],
+                "updated_at": now,
+            }
+            for task in changed.values()
+        ])
+        await rollups.apply(db)
+        await commit_changes(
+            db, [task_event("status", task) for task in changed.values()]
+        )
+    return TaskBulkResponse(items=results)
+
+
+async def get_owned_task(db: AsyncSession, task_id: str, user: User) -> Task:
     result = await db.execute(select(Task).where(Task.id == task_id))
     task = result.scalar_one_or_none()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id and not current_user.is_admin:
+    if task.owner_id != user.id and not user.is_admin:
         raise HTTPException(status_code=403, detail="Not your task")
     return task
 
 
-@router.patch("/{task_id}", response_model=TaskResponse)
-async def update_task(
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(
     task_id: str,
-    body: TaskUpdate,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Not your task")
+    task = await get_owned_task(db, task_id, current_user)
+    etag = task_etag(task.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return task
 
-    if body.title is not None:
-        task.title = body.title
-    if body.description is not None:
-        task.description = body.description
-    if body.total_minutes is not None:
-        task.total_minutes = body.total_minutes
 
-    return task
+def write_conditions(task, task_id: str, user: User, version: Optional[int] = None) -> list:
+    # `task` is Task or an alias of it
+    conditions = [task.id == task_id]
+    if not user.is_admin:
+        conditions.append(task.owner_id == user.id)
+    if version is not None:
+        conditions.append(task.version == version)
+    return conditions
 
 
-@router.patch("/{task_id}/status", response_model=TaskResponse)
-async def update_status(
+def writable(statement, task_id: str, user: User, version: Optional[int] = None):
+    # Ownership (and the If-Match version) go into the WHERE clause, so one
+    # statement both checks and writes
+    statement = statement.where(*write_conditions(Task, task_id, user, version))
+    return statement.execution_options(synchronize_session=False)
+
+
+async def raise_for_miss(
+    db: AsyncSession,
     task_id: str,
-    body: TaskStatusUpdate,
+    user: User,
+    status: Optional[str] = None,
+    version: Optional[int] = None,
+):
+    # A conditional write matched no row; one more query tells the caller why
+    row = (await db.execute(
+        select(Task.owner_id, Task.status, Task.version).where(Task.id == task_id)
+    )).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if row.owner_id != user.id and not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not your task")
+    if version is not None and row.version != version:
+        raise HTTPException(
+            status_code=412,
+            detail="Task has changed since it was read",
+            headers={"ETag": task_etag(row.version)},
+        )
+    if status is not None:
+        error = transition_error(row.status, status)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+    # The row changed between the write and this read
+    raise HTTPException(status_code=409, detail="Task was modified concurrently, retry")
+
+
+@router.post("/{task_id}/time", response_model=TimeEntryResponse, status_code=202)
+async def log_time(
+    task_id: str,
+    body: TimeEntryCreate,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
+    # Appends to the time log buffer instead of writing here; the entry is
+    # stored within TIME_LOG_FLUSH_SECONDS and added to total_minutes at the
+    # next compaction, so concurrent timers never overwrite each other
+    row = (await db.execute(
+        select(Task.owner_id).where(Task.id == task_id)
+    )).one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id and not current_user.is_admin:
+    if row.owner_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not your task")
 
-    allowed_next = TRANSITIONS.get(task.status)
-    if body.status != allowed_next:
+    entry = {
+        "id": str(uuid.uuid4()),
+        "task_id": task_id,
+        "user_id": current_user.id,
+        "minutes": body.minutes,
+        "logged_at": datetime.now(timezone.utc),
+    }
+    if not time_log.add(entry):
         raise HTTPException(
-            status_code=400,
-            detail=f"Invalid transition: '{task.status}' → '{body.status}'. Expected '{allowed_next}'",
+            status_code=503,
+            detail="Time log is backed up, retry shortly",
+            headers={"Retry-After": str(max(1, round(settings.TIME_LOG_FLUSH_SECONDS)))},
         )
+    return entry
 
-    task.status = body.status
-    return task
+
+@router.patch("/{task_id}", response_model=TaskResponse)
+async def update_task(
+    task_id: str,
+    body: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    version = parse_if_match(if_match)
+    values = body.model_dump(exclude_none=True)
+    if not values:
+        task = await get_owned_task(db, task_id, current_user)
+        if version is not None and task.version != version:
+            await raise_for_miss(db, task_id, current_user, version=version)
+        response.headers["ETag"] = task_etag(task.version)
+        return task
+
+    statement = update(Task).values(
+        **values,
+        version=Task.version + 1,
+        updated_at=datetime.now(timezone.utc),
+    )
+    returning = [getattr(Task, name) for name in TASK_FIELDS]
+    minutes_before = None
+    postgres = db.bind.dialect.name == "postgresql"
+    if "total_minutes" in values:
+        # The rollups need the old value
+        if postgres:
+            # Read in the same statement. FOR UPDATE makes it the latest
+            # committed one, and the subquery carries the write conditions,
+            # so it only locks a row the caller may write.
+            old = aliased(Task)
+            previous = (
+                select(old.id, old.total_minutes)
+                .where(*write_conditions(old, task_id, current_user, version))
+                .with_for_update()
+                .subquery("previous")
+            )
+            statement = statement.where(Task.id == previous.c.id)
+            returning.append(previous.c.total_minutes.label("minutes_before"))
+        else:
+            # SQLite cannot return a joined table's columns. Read the value
+            # first and only write if it is still current; a concurrent
+            # change makes the update miss (409) instead of skewing rollups.
+            minutes_before = (await db.execute(
+                select(Task.total_minutes)
+                .where(*write_conditions(Task, task_id, current_user, version))
+            )).scalar()
+            statement = statement.where(
+                Task.total_minutes.is_not_distinct_from(minutes_before)
+            )
+    statement = statement.returning(*returning)
+    row = (await db.execute(
+        writable(statement, task_id, current_user, version)
+    )).one_or_none()
+    if row is None:
+        await raise_for_miss(db, task_id, current_user, version=version)
+    if "total_minutes" in values:
+        if postgres:
+            minutes_before = row.minutes_before
+        rollups = TaskRollups()
+        rollups.add(
+            row.owner_id, row.status, 0,
+            (row.total_minutes or 0) - (minutes_before or 0),
+        )
+        await rollups.apply(db)
+    await commit_changes(db, [task_event("updated", row._mapping)])
+    response.headers["ETag"] = task_etag(row.version)
+    return row._mapping
+
+
+@router.patch("/{task_id}/status", response_model=TaskResponse)
+async def update_status(
+    task_id: str,
+    body: TaskStatusUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # The expected current status is part of the WHERE clause, so a
+    # concurrent move of the same task cannot be overwritten
+    version = parse_if_match(if_match)
+    previous = PREVIOUS_STATUS.get(body.status)
+    row = None
+    if previous is not None:
+        statement = update(Task).where(Task.status == previous).values(
+            status=body.status,
+            version=Task.version + 1,
+            updated_at=datetime.now(timezone.utc),
+        ).returning(*(getattr(Task, name) for name in TASK_FIELDS))
+        row = (await db.execute(
+            writable(statement, task_id, current_user, version)
+        )).one_or_none()
+    if row is None:
+        await raise_for_miss(db, task_id, current_user, body.status, version)
+    rollups = TaskRollups()
+    rollups.moved(row.id, row.owner_id, previous, row.status, row.total_minutes, row.updated_at)
+    await rollups.apply(db)
+    await commit_changes(db, [task_event("status", row._mapping)])
+    response.headers["ETag"] = task_etag(row.version)
+    return row._mapping
 
 
 @router.delete("/{task_id}", status_code=204)
 async def delete_task(
     task_id: str,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Not your task")
-    await db.delete(task)
\ No newline at end of file
+    version = parse_if_match(if_match)
+    statement = delete(Task).returning(
+        Task.id, Task.owner_id, Task.status, Task.total_minutes
+    )
+    row = (await db.execute(
+        writable(statement, task_id, current_user, version)
+    )).one_or_none()
+    if row is None:
+        await raise_for_miss(db, task_id, current_user, version=version)
+    # Reported by GET /tasks/changes until the retention period runs out
+    now = datetime.now(timezone.utc)
+    db.add(TaskTombstone(task_id=row.id, owner_id=row.owner_id, deleted_at=now))
+    await db.execute(delete(TaskTombstone).where(
+        TaskTombstone.owner_id == row.owner_id,
+        TaskTombstone.deleted_at
+        < now - timedelta(days=settings.TASK_TOMBSTONE_RETENTION_DAYS),
+    ))
+    rollups = TaskRollups()
+    rollups.deleted(row.owner_id, row.status, row.total_minutes)
+    await rollups.apply(db)
+    await commit_changes(db, [{
+        "type": "deleted",
+        "owner_id": row.owner_id,
+        "task": {"id": row.id, "owner_id": row.owner_id},
+    }])
\ No newline at end of file
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.database import get_db
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timezone
+from typing import Literal
+from app.database import get_db, get_session_factory
+from app.models.task import Task
+from app.models.task_rollup import TaskDailyRollup, TaskStatusRollup
+from app.models.task_status_change import TaskStatusChange
+from app.models.task_tombstone import TaskTombstone
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
 from app.dependencies import get_current_user, get_admin_user
+from app.services.export_service import export_response
+from app.services.task_events import commit_changes
+from app.services.user_cache import user_cache
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -23,6 +33,18 @@ async def get_all_users(
     return result.scalars().all()
 
 
+@router.get("/export")
+async def export_users(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    _: User = Depends(get_admin_user),
+):
+    query = select(
+        *(getattr(User, name) for name in UserResponse.model_fields)
+    ).order_by(User.created_at, User.id)
+    return export_response(session_factory, query, export_format, "users")
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -53,6 +75,10 @@ async def update_user(
     if body.is_admin is not None:
         user.is_admin = body.is_admin
 
+    # Invalidate only once the change is committed; a request reading the
+    # user before that would otherwise cache the old row again
+    await db.commit()
+    await user_cache.invalidate(user_id)
     return user
 
 
@@ -66,4 +92,25 @@ async def delete_user(
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    await db.delete(user)
\ No newline at end of file
+    # The user's tasks go with them. Deleted here rather than by the ORM
+    # cascade, so each one leaves a tombstone for GET /tasks/changes and a
+    # "deleted" event for GET /tasks/stream, as DELETE /tasks/{id} does.
+    task_ids = (await db.execute(
+        delete(Task).where(Task.owner_id == user_id).returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    if task_ids:
+        now = datetime.now(timezone.utc)
+        await db.execute(insert(TaskTombstone), [
+            {"task_id": task_id, "owner_id": user_id, "deleted_at": now}
+            for task_id in task_ids
+        ])
+    for table in (TaskStatusRollup, TaskDailyRollup, TaskStatusChange):
+        await db.execute(delete(table).where(table.owner_id == user_id))
+    await db.delete(user)
+    # Commits, then bumps the task list versions and publishes the events
+    await commit_changes(db, [
+        {"type": "deleted", "owner_id": user_id, "task": {"id": task_id, "owner_id": user_id}}
+        for task_id in task_ids
+    ])
+    await user_cache.invalidate(user_id)
\ No newline at end of file
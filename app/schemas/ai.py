@@ -10,4 +10,12 @@ class AISuggestRequest(BaseModel):
 class AISuggestResponse(BaseModel):
     suggestion: str
     model: str
-    generated_at: datetime
\ No newline at end of file
+    generated_at: datetime
+
+
+class AISuggestBatchRequest(BaseModel):
+    items: list[AISuggestRequest] = Field(..., min_length=1, max_length=200)
+
+
+class AISuggestBatchResponse(BaseModel):
+    items: list[AISuggestResponse]
\ No newline at end of file
@@ -0,0 +1,53 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+
+class StatusTotals(BaseModel):
+    owner_id: str
+    status: str
+    task_count: int
+    total_minutes: int
+
+
+class OwnerTotals(BaseModel):
+    owner_id: str
+    task_count: int
+    total_minutes: int
+    by_status: dict[str, int]  # task count per status
+
+
+class DailyThroughput(BaseModel):
+    day: date
+    created: int
+    completed: int
+
+
+class AnalyticsSummary(BaseModel):
+    start: date
+    end: date
+    by_owner_status: list[StatusTotals]
+    by_owner: list[OwnerTotals]
+    by_status: dict[str, int]
+    total_minutes: int
+    throughput: list[DailyThroughput]
+
+
+class DurationStats(BaseModel):
+    count: int
+    avg_hours: float
+    p50_hours: float
+    p85_hours: float
+    p95_hours: float
+
+
+class OwnerCycleTime(BaseModel):
+    owner_id: str
+    lead_time: Optional[DurationStats] = None  # created -> done
+    cycle_time: Optional[DurationStats] = None  # first in_progress -> done
+
+
+class CycleTimeReport(BaseModel):
+    start: date
+    end: date
+    owners: list[OwnerCycleTime]
@@ -1,12 +1,15 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
+
+# Matches the ck_tasks_status constraint on tasks.status
+TaskStatus = Literal["todo", "in_progress", "done"]
 
 
 class TaskCreate(BaseModel):
     title: str = Field(..., min_length=3, max_length=100)
     description: Optional[str] = None
-    status: str = "todo"
+    status: TaskStatus = "todo"
     total_minutes: int = 0
 
 
@@ -27,8 +30,93 @@ class TaskResponse(BaseModel):
     status: str
     total_minutes: int
     owner_id: str
+    version: int
     created_at: datetime
     updated_at: Optional[datetime]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Same fields as TaskResponse, all optional, so GET /tasks/?fields= can
+# return only the requested columns
+class TaskPartialResponse(BaseModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    total_minutes: Optional[int] = None
+    owner_id: Optional[str] = None
+    version: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# Bulk endpoints; results come back per item, in request order
+BULK_MAX_ITEMS = 200
+
+
+class TaskBulkCreate(BaseModel):
+    items: list[TaskCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: str
+
+
+class TaskBulkUpdate(BaseModel):
+    items: list[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkStatusItem(TaskStatusUpdate):
+    id: str
+
+
+class TaskBulkStatusUpdate(BaseModel):
+    items: list[TaskBulkStatusItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkResult(BaseModel):
+    id: str
+    status_code: int
+    task: Optional[TaskResponse] = None
+    detail: Optional[str] = None
+
+
+class TaskBulkResponse(BaseModel):
+    items: list[TaskBulkResult]
+
+
+# GET /tasks/changes
+class TaskTombstoneResponse(BaseModel):
+    id: str
+    deleted_at: datetime
+
+
+class TaskChangesResponse(BaseModel):
+    changed: list[TaskResponse]
+    deleted: list[TaskTombstoneResponse]
+    cursor: str
+    has_more: bool
+
+
+# POST /tasks/stream/ticket
+class StreamTicketResponse(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+# POST /tasks/{task_id}/time
+class TimeEntryCreate(BaseModel):
+    minutes: int = Field(..., ge=1, le=24 * 60)
+
+
+class TimeEntryResponse(BaseModel):
+    id: str
+    task_id: str
+    user_id: str
+    minutes: int
+    logged_at: datetime
@@ -0,0 +1,77 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from app.cache import TTLCache
+from app.config import settings
+
+# Recently verified tokens, keyed by SHA-256 of the raw token. Entries never
+# outlive the token's own `exp` claim.
+verified_tokens = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+)
+
+
+# GET /tasks/stream is authenticated through its URL (browsers' EventSource
+# cannot set headers), and URLs end up in access logs. So it takes a ticket
+# instead of the JWT: a token that expires within seconds and is accepted by
+# the stream endpoint only.
+STREAM_TICKET_SCOPE = "stream"
+
+
+def create_stream_ticket(user_id: str) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.TASK_STREAM_TICKET_SECONDS
+    )
+    payload = {"sub": user_id, "exp": expire, "scope": STREAM_TICKET_SCOPE}
+    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+
+def decode_token(token: str) -> dict:
+    # Raises JWTError if the token is invalid or expired
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(key)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+        verified_tokens.delete(key)
+
+    payload = jwt.decode(
+        token,
+        settings.JWT_SECRET,
+        algorithms=[settings.JWT_ALGORITHM],
+    )
+
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        verified_tokens.set(key, payload, ttl=ttl)
+    return payload
+
+
+def verify_request_token(request: Request) -> Optional[dict]:
+    # Verifies the bearer token at most once per request. The payload (or
+    # None for a missing/invalid token) is stashed on request.state so the
+    # logging middleware and get_current_user share a single decode.
+    if hasattr(request.state, "token_payload"):
+        return request.state.token_payload
+
+    payload = None
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = decode_token(token)
+        except JWTError:
+            payload = None
+        # A stream ticket is not a bearer token
+        if payload is not None and payload.get("scope") == STREAM_TICKET_SCOPE:
+            payload = None
+
+    request.state.token_payload = payload
+    return payload
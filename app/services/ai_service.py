@@ -1,5 +1,14 @@
+import asyncio
+import logging
 from datetime import datetime, timezone
+from typing import Optional
+from app.cache import TTLCache
 from app.config import settings
+from app.metrics import metrics
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger("sprintsync.ai")
 
 STUB_RESPONSE = {
     "suggestion": (
@@ -11,55 +20,172 @@ STUB_RESPONSE = {
     "generated_at": None,
 }
 
+FALLBACK_SUGGESTION = "AI unavailable. Please describe this task manually."
 
-async def generate_suggestion(title: str) -> dict:
-    now = datetime.now(timezone.utc)
+SYSTEM_PROMPT = (
+    "You are a senior software engineer writing sprint card descriptions. "
+    "Given a short task title, return a clear, actionable 2-3 sentence "
+    "engineering description. Be specific and use technical language. "
+    "Do not repeat the title in your response."
+)
 
-    print(f"DEBUG: AI_MODE = {settings.AI_MODE}")
 
-    if settings.AI_MODE == "stub":
-        return {**STUB_RESPONSE, "generated_at": now}
+class GroqProvider:
+    model = "llama-3.1-8b-instant"
 
-    try:
-        from groq import Groq
+    def __init__(self):
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
-        client = Groq(api_key=settings.GROQ_API_KEY)
+    def _bind(self) -> None:
+        # The client's connection pool belongs to one event loop; rebuild it
+        # if we are now running on a different one
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        from groq import AsyncGroq
 
-        print(f"DEBUG: Calling Groq API...")
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
+        self._client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL or None,
+            timeout=settings.AI_TIMEOUT_SECONDS,
+            max_retries=0,
+        )
+        self._loop = loop
+
+    async def complete(self, title: str) -> str:
+        self._bind()
+        response = await self._client.chat.completions.create(
+            model=self.model,
             messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a senior software engineer writing sprint card descriptions. "
-                        "Given a short task title, return a clear, actionable 2-3 sentence "
-                        "engineering description. Be specific and use technical language. "
-                        "Do not repeat the title in your response."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Task title: {title}"
-                }
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Task title: {title}"},
             ],
             max_tokens=150,
             temperature=0.4,
         )
+        return response.choices[0].message.content.strip()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._loop = None
+
+
+provider = GroqProvider()
+
+# Successful suggestions keyed by normalized title
+suggestion_cache = TTLCache(
+    maxsize=settings.AI_CACHE_MAX_SIZE,
+    ttl=settings.AI_CACHE_TTL_SECONDS,
+)
+
+
+# Identical titles requested at the same time share one upstream call
+inflight = SingleFlight()
+
+# While the provider is failing or slow, skip it and fall back immediately
+breaker = CircuitBreaker(
+    failure_rate_threshold=settings.AI_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.AI_BREAKER_SLOW_CALL_SECONDS,
+    window_size=settings.AI_BREAKER_WINDOW,
+    min_calls=settings.AI_BREAKER_MIN_CALLS,
+    open_seconds=settings.AI_BREAKER_OPEN_SECONDS,
+)
+
+# At most AI_MAX_CONCURRENCY provider calls at once. Callers queue for a slot
+# before the breaker and timeout start, so time spent waiting here never
+# counts as a slow call. Like the client, the semaphore belongs to one loop.
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _upstream_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots_loop is not loop:
+        _slots = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+def set_provider(new_provider) -> None:
+    global provider
+    provider = new_provider
+
 
-        suggestion = response.choices[0].message.content.strip()
-        print(f"DEBUG: Got response: {suggestion[:80]}")
+async def close_ai_client() -> None:
+    await provider.aclose()
 
-        return {
-            "suggestion": suggestion,
-            "model": "llama-3.1-8b-instant",
-            "generated_at": now,
-        }
 
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+async def generate_suggestion(title: str) -> dict:
+    now = datetime.now(timezone.utc)
+
+    if settings.AI_MODE == "stub":
+        return {**STUB_RESPONSE, "generated_at": now}
+
+    key = normalize_title(title)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result, shared = await inflight.do(key, lambda: _generate(key, title, now))
+    if shared:
+        metrics["ai_suggest_coalesced_total"] += 1
+    return result
+
+
+async def generate_suggestions(titles: list[str]) -> list[dict]:
+    # Duplicate titles (after normalization) are generated once; results
+    # come back in request order. Failures fall back per item because
+    # generate_suggestion never raises for provider errors.
+    unique: dict[str, str] = {}
+    for title in titles:
+        unique.setdefault(normalize_title(title), title)
+
+    semaphore = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+
+    async def generate_one(title: str) -> dict:
+        async with semaphore:
+            return await generate_suggestion(title)
+
+    results = await asyncio.gather(*(generate_one(t) for t in unique.values()))
+    by_key = dict(zip(unique, results))
+    return [by_key[normalize_title(title)] for title in titles]
+
+
+async def _complete(title: str) -> str:
+    # Only reached when the breaker lets the call through
+    metrics["ai_suggest_upstream_total"] += 1
+    return await asyncio.wait_for(
+        provider.complete(title), timeout=settings.AI_TIMEOUT_SECONDS
+    )
+
+
+async def _generate(key: str, title: str, now: datetime) -> dict:
+    fallback = {
+        "suggestion": FALLBACK_SUGGESTION,
+        "model": "fallback",
+        "generated_at": now,
+    }
+    try:
+        async with _upstream_slots():
+            suggestion = await breaker.call(lambda: _complete(title))
+    except CircuitOpenError:
+        return fallback
     except Exception as exc:
-        print(f"DEBUG: Groq error = {type(exc).__name__}: {str(exc)}")
-        return {
-            "suggestion": "AI unavailable. Please describe this task manually.",
-            "model": "fallback",
-            "generated_at": now,
-        }
\ No newline at end of file
+        logger.warning("AI provider error: %s: %s", type(exc).__name__, exc)
+        return fallback
+
+    result = {
+        "suggestion": suggestion,
+        "model": provider.model,
+        "generated_at": now,
+    }
+    suggestion_cache.set(key, result)
+    return result
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# Closed: calls go through and outcomes are recorded in a rolling window.
+# Calls slower than `slow_call_seconds` count as failures. Once the window
+# holds `min_calls` outcomes and the failure rate reaches the threshold, the
+# breaker opens and rejects calls for `open_seconds`. It then goes half-open
+# and lets `half_open_max_calls` probes through: a success closes it, a
+# failure opens it again.
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.trips = 0
+        self.short_circuits = 0
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        self.short_circuits += 1
+        return False
+
+    def record(self, success: bool, duration: float) -> None:
+        if duration >= self.slow_call_seconds:
+            success = False
+
+        if self._state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if success:
+                self._state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._trip()
+            return
+
+        self._outcomes.append(success)
+        if (
+            self._state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and self.failure_rate >= self.failure_rate_threshold
+        ):
+            self._trip()
+
+    def reset(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._probes = 0
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.trips += 1
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.allow():
+            raise CircuitOpenError("circuit open")
+        t1 = self.clock()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Caller went away; says nothing about the provider's health
+            if self._state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+            raise
+        except Exception:
+            self.record(False, self.clock() - t1)
+            raise
+        self.record(True, self.clock() - t1)
+        return result
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Sequence
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import sessionmaker
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _to_json(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_chunk(columns: Sequence[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_to_json) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def stream_export(
+    session_factory: sessionmaker,
+    query: Select,
+    export_format: str,
+) -> AsyncIterator[str]:
+    # Uses its own session: StreamingResponse bodies are sent after the
+    # request-scoped get_db session has already been closed
+    columns = [column.name for column in query.selected_columns]
+
+    if export_format == "csv":
+        yield _csv_chunk([columns])
+
+    async with session_factory() as session:
+        result = await session.stream(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            if export_format == "csv":
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(columns, rows)
+
+
+def export_response(
+    session_factory: sessionmaker,
+    query: Select,
+    export_format: str,
+    filename: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_export(session_factory, query, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
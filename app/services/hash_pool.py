@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from app.config import settings
+from app.metrics import metrics
+
+# bcrypt releases the GIL while hashing, so a small thread pool gives real
+# parallelism without blocking the event loop
+executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+
+class HashPoolBusy(Exception):
+    # The queue is full; the API answers 503 with Retry-After (see main.py)
+    pass
+
+
+def _job_done(_) -> None:
+    metrics["password_hash_queue_depth"] -= 1
+
+
+async def run_in_hash_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    # Queue depth counts jobs waiting for a worker plus jobs running.
+    # Past the limit we shed load instead of letting logins pile up.
+    if metrics["password_hash_queue_depth"] >= settings.PASSWORD_HASH_MAX_QUEUE:
+        metrics["password_hash_rejected_total"] += 1
+        raise HashPoolBusy()
+
+    loop = asyncio.get_running_loop()
+    metrics["password_hash_queue_depth"] += 1
+    job = executor.submit(fn, *args)
+    # A cancelled caller leaves a running job behind, so the job is only
+    # counted out when it finishes (or is cancelled before it started)
+    job.add_done_callback(lambda job: loop.call_soon_threadsafe(_job_done, job))
+    return await asyncio.wrap_future(job)
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+# Concurrent calls with the same key share one in-flight call: the first
+# caller starts it, and every caller waits for its result (or exception)
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        # Returns (result, shared); shared is True for callers that joined
+        # someone else's call
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            # Runs in its own task, so the caller that started it can be
+            # cancelled (e.g. its client disconnected) without failing the
+            # callers that joined
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark retrieved so a call every caller abandoned doesn't warn
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.metrics import metrics
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.task import TaskResponse
+from app.services.task_versions import task_versions
+
+# Task change feed behind GET /tasks/stream. Write handlers publish events
+# through a broker; each worker's hub fans them out to the Server-Sent Events
+# connections it holds. An idle connection is one coroutine parked on an
+# asyncio.Event, so a worker can hold thousands of them.
+
+# Sentinels a subscriber can receive in place of an event frame
+RESYNC = object()
+CLOSED = object()
+
+
+class TaskEventBroker(ABC):
+    # Carries events to every worker. A shared implementation (e.g. Redis
+    # pub/sub) publishes to its channel and calls `deliver`, on the event
+    # loop, for every message it receives, including its own.
+    deliver: Callable[[dict], None]
+
+    def attach(self, deliver: Callable[[dict], None]) -> None:
+        self.deliver = deliver
+
+    @abstractmethod
+    async def publish(self, event: dict) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalTaskEventBroker(TaskEventBroker):
+    async def publish(self, event: dict) -> None:
+        self.deliver(event)
+
+
+class Subscription:
+    # Bounded per-connection buffer. A client that falls `maxsize` events
+    # behind loses its backlog and is told to resync instead of holding
+    # memory for a connection that cannot keep up.
+    def __init__(self, user: User, maxsize: int):
+        self.user = user
+        self.maxsize = maxsize
+        self.frames: deque = deque()
+        self.ready = asyncio.Event()
+
+    def put(self, frame) -> None:
+        if frame is CLOSED:
+            self.frames.append(frame)
+        elif self.frames and self.frames[-1] is RESYNC:
+            pass
+        elif len(self.frames) >= self.maxsize:
+            self.frames.clear()
+            self.frames.append(RESYNC)
+            metrics["task_stream_resyncs_total"] += 1
+        else:
+            self.frames.append(frame)
+        self.ready.set()
+
+    async def get(self, timeout: float) -> Optional[object]:
+        # Next frame, or None when nothing arrived within `timeout`
+        if not self.frames:
+            self.ready.clear()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self.ready.wait()
+            except TimeoutError:
+                return None
+        return self.frames.popleft()
+
+
+def task_event(event_type: str, task) -> dict:
+    # `task` is a Task, a row mapping or a dict of TaskResponse fields
+    if not isinstance(task, (Task, dict)):
+        task = dict(task)
+    data = TaskResponse.model_validate(task).model_dump(mode="json")
+    return {"type": event_type, "owner_id": data["owner_id"], "task": data}
+
+
+def encode_frame(event_id: int, event: dict) -> str:
+    return (
+        f"id: {event_id}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event['task'])}\n\n"
+    )
+
+
+class TaskEventHub:
+    def __init__(self, broker: TaskEventBroker):
+        self.by_owner: dict[str, set[Subscription]] = {}
+        self.admins: set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self.set_broker(broker)
+
+    def set_broker(self, broker: TaskEventBroker) -> None:
+        self.broker = broker
+        broker.attach(self.dispatch)
+
+    async def publish(self, events: list[dict]) -> None:
+        # Each event: {"type": ..., "owner_id": ..., "task": {...}}
+        for event in events:
+            await self.broker.publish(event)
+
+    def dispatch(self, event: dict) -> None:
+        # Encoded once per worker, shared by every recipient
+        subscribers = self.by_owner.get(event["owner_id"], set()) | self.admins
+        if not subscribers:
+            return
+        frame = encode_frame(next(self._ids), event)
+        for subscription in subscribers:
+            subscription.put(frame)
+        metrics["task_stream_events_total"] += len(subscribers)
+
+    def subscribe(self, user: User) -> Subscription:
+        subscription = Subscription(user, settings.TASK_STREAM_QUEUE_SIZE)
+        if user.is_admin:
+            self.admins.add(subscription)
+        else:
+            self.by_owner.setdefault(user.id, set()).add(subscription)
+        metrics["task_stream_connections"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        user = subscription.user
+        if user.is_admin:
+            self.admins.discard(subscription)
+        else:
+            owners = self.by_owner.get(user.id, set())
+            owners.discard(subscription)
+            if not owners:
+                self.by_owner.pop(user.id, None)
+        metrics["task_stream_connections"] -= 1
+
+    async def close(self) -> None:
+        # Ends every open stream, e.g. on shutdown
+        for subscriptions in [*self.by_owner.values(), self.admins]:
+            for subscription in subscriptions:
+                subscription.put(CLOSED)
+        await self.broker.close()
+
+    async def stream(self, user: User) -> AsyncIterator[str]:
+        # The client should load GET /tasks/ after "ready" and again after
+        # every "resync"; in between, events keep its copy current. The
+        # subscription is made here rather than by the caller, so a client
+        # gone before the body starts never leaves one behind.
+        subscription = self.subscribe(user)
+        try:
+            yield "retry: 3000\nevent: ready\ndata: {}\n\n"
+            while True:
+                frame = await subscription.get(settings.TASK_STREAM_HEARTBEAT_SECONDS)
+                if frame is None:
+                    yield ": keepalive\n\n"
+                elif frame is CLOSED:
+                    return
+                elif frame is RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+
+task_events = TaskEventHub(LocalTaskEventBroker())
+
+
+def set_task_event_broker(broker: TaskEventBroker) -> None:
+    task_events.set_broker(broker)
+
+
+async def commit_changes(db: AsyncSession, events: list[dict]) -> None:
+    # Commit before bumping the list version and publishing to
+    # GET /tasks/stream, so anyone who hears of a change can already read it
+    # (get_db's own commit is then a no-op)
+    await db.commit()
+    await task_versions.record_write({event["owner_id"] for event in events})
+    await task_events.publish(events)
@@ -0,0 +1,90 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.task_rollup import TaskDailyRollup, TaskStatusRollup
+from app.models.task_status_change import TaskStatusChange
+
+# Incremental maintenance of the analytics rollups and the status history. A
+# write handler records what it changed in a TaskRollups and applies it in
+# its own transaction, so both commit or roll back with the task rows.
+# Aggregates are applied as deltas (count = count + n), which concurrent
+# writers can add in any order without overwriting each other.
+
+DONE = "done"
+
+
+class TaskRollups:
+    def __init__(self):
+        # (owner_id, status) -> [task_count, total_minutes]
+        self.statuses: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0])
+        # (day, owner_id) -> [created, completed]
+        self.days: dict[tuple[date, str], list[int]] = defaultdict(lambda: [0, 0])
+        self.transitions: list[dict] = []
+
+    def created(self, task_id: str, owner_id: str, status: str, minutes: int, at: datetime) -> None:
+        self.add(owner_id, status, 1, minutes)
+        self.transition(task_id, owner_id, None, status, at)
+        self.days[(at.date(), owner_id)][0] += 1
+        if status == DONE:
+            self.days[(at.date(), owner_id)][1] += 1
+
+    def deleted(self, owner_id: str, status: str, minutes: int) -> None:
+        self.add(owner_id, status, -1, -minutes)
+
+    def moved(self, task_id: str, owner_id: str, old: str, new: str, minutes: int, at: datetime) -> None:
+        self.transition(task_id, owner_id, old, new, at)
+        self.add(owner_id, old, -1, -minutes)
+        self.add(owner_id, new, 1, minutes)
+        if new == DONE:
+            self.days[(at.date(), owner_id)][1] += 1
+
+    def transition(self, task_id: str, owner_id: str, old: Optional[str], new: str, at: datetime) -> None:
+        self.transitions.append({
+            "task_id": task_id,
+            "owner_id": owner_id,
+            "from_status": old,
+            "to_status": new,
+            "changed_at": at,
+        })
+
+    def add(self, owner_id: str, status: str, count: int, minutes: int) -> None:
+        totals = self.statuses[(owner_id, status)]
+        totals[0] += count
+        totals[1] += minutes or 0
+
+    async def apply(self, db: AsyncSession) -> None:
+        # One upsert per table. Keys are sorted so concurrent transactions
+        # lock rollup rows in the same order.
+        statuses = [
+            {"owner_id": owner_id, "status": status, "task_count": count, "total_minutes": minutes}
+            for (owner_id, status), (count, minutes) in sorted(self.statuses.items())
+            if count or minutes
+        ]
+        days = [
+            {"day": day, "owner_id": owner_id, "created": created, "completed": completed}
+            for (day, owner_id), (created, completed) in sorted(self.days.items())
+        ]
+        if statuses:
+            await db.execute(upsert_increment(
+                db, TaskStatusRollup, statuses, ("task_count", "total_minutes")
+            ))
+        if days:
+            await db.execute(upsert_increment(
+                db, TaskDailyRollup, days, ("created", "completed")
+            ))
+        if self.transitions:
+            await db.execute(insert(TaskStatusChange).values(self.transitions))
+
+
+def upsert_increment(db: AsyncSession, model, rows: list[dict], counters: tuple[str, ...]):
+    # INSERT ... ON CONFLICT (primary key) DO UPDATE SET counter = counter + new
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(model).values(rows)
+    table = model.__table__
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={name: table.c[name] + statement.excluded[name] for name in counters},
+    )
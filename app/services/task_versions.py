@@ -0,0 +1,85 @@
+import hashlib
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Iterable
+from app.cache import TTLCache
+from app.config import settings
+from app.models.user import User
+
+# Change versions for GET /tasks/. Every task write bumps the version of the
+# task owner's scope and of the global scope (what admins see); a list
+# response is identified by the version of the scope it was read from, so
+# idle polling can be answered with a 304 or a cached payload without
+# touching the database.
+
+GLOBAL_SCOPE = "all"
+
+
+def owner_scope(owner_id: str) -> str:
+    return f"owner:{owner_id}"
+
+
+class ChangeVersionBackend(ABC):
+    # Interface for a store shared by all workers (e.g. Redis INCR), so a
+    # write on one worker changes the version the others serve
+    @abstractmethod
+    async def get(self, scope: str) -> tuple[str, float]:
+        # (opaque version token, unix time of the last change)
+        ...
+
+    @abstractmethod
+    async def bump(self, scopes: Iterable[str]) -> None:
+        ...
+
+
+class LocalChangeVersionBackend(ChangeVersionBackend):
+    # Per-process counters. Tokens carry a random boot id, so versions from
+    # before a restart never match again.
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.started_at = time.time()
+        self.versions: dict[str, tuple[int, float]] = {}
+
+    async def get(self, scope: str) -> tuple[str, float]:
+        version, changed_at = self.versions.get(scope, (0, self.started_at))
+        return f"{self.boot_id}.{version}", changed_at
+
+    async def bump(self, scopes: Iterable[str]) -> None:
+        now = time.time()
+        for scope in scopes:
+            version, _ = self.versions.get(scope, (0, now))
+            self.versions[scope] = (version + 1, now)
+
+
+class TaskChangeVersions:
+    def __init__(self, backend: ChangeVersionBackend):
+        self.backend = backend
+
+    async def validators(self, user: User) -> tuple[str, datetime]:
+        # Weak ETag and Last-Modified for the task list `user` can see
+        scope = GLOBAL_SCOPE if user.is_admin else owner_scope(user.id)
+        token, changed_at = await self.backend.get(scope)
+        digest = hashlib.sha256(f"{scope}|{token}".encode()).hexdigest()[:20]
+        return f'W/"{digest}"', datetime.fromtimestamp(changed_at, timezone.utc)
+
+    async def record_write(self, owner_ids: Iterable[str]) -> None:
+        scopes = {owner_scope(owner_id) for owner_id in owner_ids}
+        if scopes:
+            await self.backend.bump([*scopes, GLOBAL_SCOPE])
+
+
+task_versions = TaskChangeVersions(LocalChangeVersionBackend())
+
+# Serialized GET /tasks/ responses keyed by (ETag, query string). A write
+# changes the ETag, which is what invalidates entries; the TTL only bounds
+# memory held by lists nobody asks for any more. Size 0 disables it.
+task_list_cache = TTLCache(
+    maxsize=settings.TASK_LIST_CACHE_MAX_SIZE,
+    ttl=settings.TASK_LIST_CACHE_TTL_SECONDS,
+)
+
+
+def set_task_versions_backend(backend: ChangeVersionBackend) -> None:
+    task_versions.backend = backend
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import case, func, insert, literal, select, update
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.metrics import metrics
+from app.models.task import Task
+from app.models.time_entry import TimeEntry
+from app.schemas.task import TaskResponse
+from app.services.task_events import commit_changes, task_event
+from app.services.task_rollups import TaskRollups
+
+logger = logging.getLogger("sprintsync.time_log")
+
+# Buffered ingestion for POST /tasks/{task_id}/time. Requests append to an
+# in-memory buffer; a background loop writes it out as multi-row INSERTs and
+# every TIME_LOG_COMPACT_SECONDS folds the written entries into
+# Task.total_minutes. Entries still buffered when a worker is killed are
+# lost, at most TIME_LOG_FLUSH_SECONDS worth; a normal shutdown flushes them.
+
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+
+
+def add_minutes(totals: dict[str, int]):
+    # One UPDATE adding totals[task_id] to each task's total_minutes. The
+    # CASE keys are bound with the id column's type: as plain strings they
+    # would go to Postgres as varchar, which it won't compare with uuid.
+    minutes = case(
+        {literal(task_id, Task.id.type): added for task_id, added in totals.items()},
+        value=Task.id,
+    )
+    return (
+        update(Task)
+        .where(Task.id.in_(totals))
+        .values(
+            total_minutes=func.coalesce(Task.total_minutes, 0) + minutes,
+            version=Task.version + 1,
+            updated_at=datetime.now(timezone.utc),
+        )
+        .returning(*(getattr(Task, name) for name in TASK_FIELDS))
+        .execution_options(synchronize_session=False)
+    )
+
+
+class TimeLog:
+    def __init__(self):
+        self.buffer: list[dict] = []
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, entry: dict) -> bool:
+        # False when the buffer is full, i.e. flushing is failing or behind
+        if len(self.buffer) >= settings.TIME_LOG_MAX_BUFFER:
+            metrics["time_log_rejected_total"] += 1
+            return False
+        self.buffer.append(entry)
+        metrics["time_log_buffered"] = len(self.buffer)
+        if len(self.buffer) >= settings.TIME_LOG_BATCH_SIZE:
+            self.wakeup.set()
+        return True
+
+    async def flush(self, session_factory: sessionmaker) -> int:
+        # Writes everything buffered so far, one INSERT per batch. A batch
+        # that fails goes back to the front of the buffer for the next try.
+        flushed = 0
+        while self.buffer:
+            batch = self.buffer[:settings.TIME_LOG_BATCH_SIZE]
+            del self.buffer[:len(batch)]
+            try:
+                async with session_factory() as db:
+                    await db.execute(insert(TimeEntry).values(batch))
+                    await db.commit()
+            except BaseException:
+                self.buffer[:0] = batch
+                raise
+            finally:
+                metrics["time_log_buffered"] = len(self.buffer)
+            flushed += len(batch)
+            metrics["time_entries_flushed_total"] += len(batch)
+        return flushed
+
+    async def compact(self, session_factory: sessionmaker) -> int:
+        compacted = 0
+        while True:
+            claimed = await self._compact_batch(session_factory)
+            compacted += claimed
+            if claimed < settings.TIME_LOG_COMPACT_BATCH_SIZE:
+                return compacted
+
+    async def _compact_batch(self, session_factory: sessionmaker) -> int:
+        # Marking entries compacted with UPDATE ... RETURNING claims them, so
+        # workers compacting at the same time never count an entry twice.
+        # The claim, the new totals and the rollups commit together.
+        async with session_factory() as db:
+            pending = select(TimeEntry.id).where(~TimeEntry.compacted).limit(
+                settings.TIME_LOG_COMPACT_BATCH_SIZE
+            )
+            claimed = (await db.execute(
+                update(TimeEntry)
+                .where(TimeEntry.id.in_(pending), ~TimeEntry.compacted)
+                .values(compacted=True)
+                .returning(TimeEntry.task_id, TimeEntry.minutes)
+                .execution_options(synchronize_session=False)
+            )).all()
+            if not claimed:
+                return 0
+
+            totals: dict[str, int] = {}
+            for task_id, minutes in claimed:
+                totals[task_id] = totals.get(task_id, 0) + minutes
+            # Entries of deleted tasks match no row and are simply dropped
+            rows = (await db.execute(add_minutes(totals))).all()
+            rollups = TaskRollups()
+            for row in rows:
+                rollups.add(row.owner_id, row.status, 0, totals[row.id])
+            await rollups.apply(db)
+            await commit_changes(db, [task_event("updated", row._mapping) for row in rows])
+        metrics["time_entries_compacted_total"] += len(claimed)
+        return len(claimed)
+
+    async def run(self, session_factory: sessionmaker) -> None:
+        last_compaction = time.monotonic()
+        while not self.stopping:
+            try:
+                async with asyncio.timeout(settings.TIME_LOG_FLUSH_SECONDS):
+                    await self.wakeup.wait()
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush(session_factory)
+                if time.monotonic() - last_compaction >= settings.TIME_LOG_COMPACT_SECONDS:
+                    last_compaction = time.monotonic()
+                    await self.compact(session_factory)
+            except Exception:
+                metrics["time_log_flush_errors_total"] += 1
+                logger.exception("Time log flush failed")
+
+        try:
+            await self.flush(session_factory)
+            await self.compact(session_factory)
+        except Exception:
+            metrics["time_log_flush_errors_total"] += 1
+            logger.exception("Time log flush on shutdown failed, %d entries lost", len(self.buffer))
+
+    def start(self, session_factory: sessionmaker) -> None:
+        self.stopping = False
+        self.wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self.run(session_factory))
+
+    async def stop(self) -> None:
+        # Lets the loop finish its current flush, then flush what is left
+        if self._task is None:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        await self._task
+        self._task = None
+
+
+time_log = TimeLog()
@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from app.cache import TTLCache
+from app.config import settings
+from app.metrics import metrics
+from app.models.user import User
+
+# Columns kept in the cache. The password hash is deliberately left out:
+# authenticated routes never need it and it should not sit in a shared store.
+CACHED_COLUMNS = ("id", "email", "is_admin", "created_at")
+
+
+class UserCacheBackend(ABC):
+    # Interface for a store shared by all workers (e.g. Redis), so an
+    # invalidation on one worker is seen by the others
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, user_id: str, data: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, user_id: str) -> None:
+        ...
+
+
+class LocalUserCacheBackend(UserCacheBackend):
+    def __init__(self, maxsize: int, ttl: float):
+        self.store = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return self.store.get(user_id)
+
+    async def set(self, user_id: str, data: dict) -> None:
+        self.store.set(user_id, data)
+
+    async def delete(self, user_id: str) -> None:
+        self.store.delete(user_id)
+
+
+class UserCache:
+    def __init__(self, backend: UserCacheBackend):
+        self.backend = backend
+
+    async def get(self, user_id: str) -> Optional[User]:
+        data = await self.backend.get(user_id)
+        if data is None:
+            metrics["user_cache_misses_total"] += 1
+            return None
+        metrics["user_cache_hits_total"] += 1
+        # Detached instance: safe to share across requests and sessions
+        return User(**data)
+
+    async def set(self, user: User) -> None:
+        data = {column: getattr(user, column) for column in CACHED_COLUMNS}
+        await self.backend.set(user.id, data)
+
+    async def invalidate(self, user_id: str) -> None:
+        await self.backend.delete(user_id)
+
+
+user_cache = UserCache(
+    LocalUserCacheBackend(
+        maxsize=settings.USER_CACHE_MAX_SIZE,
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+    )
+)
+
+
+def set_user_cache_backend(backend: UserCacheBackend) -> None:
+    user_cache.backend = backend
@@ -0,0 +1,140 @@
+"""Overhead of LoggingMiddleware.
+
+Two measurements, both in-process:
+
+1. GET /users/me through the real app on a throwaway SQLite database, with
+   and without LoggingMiddleware, interleaved over several rounds. The
+   headline overhead is the median of the per-round ratios. It includes
+   the work the log listener thread does for each request while holding
+   the GIL.
+2. Added cost per request on the event loop alone: a no-op ASGI app called
+   directly, bare and wrapped in LoggingMiddleware.
+
+Log lines go to os.devnull through the normal queue listener and handler.
+
+    python -m benchmarks.bench_middleware [requests]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.middleware import LoggingMiddleware  # noqa: E402
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/users/me",
+    "headers": [],
+    "state": {},
+}
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(asgi_app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await asgi_app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def set_logging_middleware(enabled: bool, middleware: list) -> None:
+    app.user_middleware = [
+        m for m in middleware if enabled or m.cls is not LoggingMiddleware
+    ]
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def users_me_us(client: AsyncClient, headers: dict, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/users/me", headers=headers)
+        assert response.status_code == 200
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int, rounds: int = 61) -> None:
+    # The log handler writes to whatever sys.stderr is when it emits
+    sys.stderr = open(os.devnull, "w")
+
+    # Middleware alone
+    wrapped = LoggingMiddleware(noop_app)
+    await per_request_us(wrapped, 1000)  # warm-up
+    bare_samples, wrapped_samples = [], []
+    for _ in range(rounds):
+        bare_samples.append(await per_request_us(noop_app, requests * 5))
+        wrapped_samples.append(await per_request_us(wrapped, requests * 5))
+    added_us = statistics.median(
+        w - b for w, b in zip(wrapped_samples, bare_samples)
+    )
+
+    # Full request
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    middleware = list(app.user_middleware)
+    results = {True: [], False: []}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        res = await client.post("/auth/register", json={
+            "email": "bench@example.com",
+            "password": "benchpass",
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        for i in range(rounds):
+            # Alternate which run goes first so drift affects both alike
+            for enabled in ((False, True) if i % 2 else (True, False)):
+                set_logging_middleware(enabled, middleware)
+                await users_me_us(client, headers, 5)  # warm-up
+                results[enabled].append(await users_me_us(client, headers, requests))
+
+    await engine.dispose()
+    without = statistics.median(results[False])
+    with_mw = statistics.median(results[True])
+    overhead = statistics.median(
+        w / b - 1 for w, b in zip(results[True], results[False])
+    )
+
+    print(f"LoggingMiddleware, median of {rounds} rounds")
+    print(f"  GET /users/me without:           {without:8.1f} us")
+    print(f"  GET /users/me with:              {with_mw:8.1f} us")
+    print(f"  overhead (with / without - 1):   {overhead:8.1%}")
+    print(f"  added on the event loop alone:   {added_us:8.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
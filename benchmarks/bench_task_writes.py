@@ -0,0 +1,143 @@
+"""Latency of PATCH /tasks/{id} under concurrent writers.
+
+Compares the single-statement UPDATE ... RETURNING handler with the previous
+SELECT-then-flush implementation, mounted under /legacy-tasks for the run.
+Each of `writers` concurrent clients renames its own task over and over; the
+two variants are interleaved over several rounds and the medians reported.
+Failed requests (on SQLite, "database is locked" once writers queue past the
+busy timeout) are counted rather than aborting the run.
+
+Uses a throwaway SQLite database unless BENCH_DATABASE_URL is set (e.g. a
+scratch Postgres database, where round trips cost more):
+
+    python -m benchmarks.bench_task_writes [requests per writer] [writers]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from fastapi import APIRouter, Depends, HTTPException  # noqa: E402
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.dependencies import get_current_user  # noqa: E402
+from app.models.task import Task  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.task import TaskResponse, TaskUpdate  # noqa: E402
+
+legacy = APIRouter(prefix="/legacy-tasks")
+
+
+@legacy.patch("/{task_id}", response_model=TaskResponse)
+async def legacy_update_task(
+    task_id: str,
+    body: TaskUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    result = await db.execute(select(Task).where(Task.id == task_id))
+    task = result.scalar_one_or_none()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not your task")
+
+    if body.title is not None:
+        task.title = body.title
+    if body.description is not None:
+        task.description = body.description
+    if body.total_minutes is not None:
+        task.total_minutes = body.total_minutes
+
+    # Written by the flush at commit, after the response is serialized
+    return task
+
+
+async def writer(client: AsyncClient, prefix: str, task_id: str, headers: dict, requests: int) -> tuple[list[float], int]:
+    latencies, errors = [], 0
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.patch(
+            f"{prefix}/{task_id}", json={"title": f"Renamed {i}"}, headers=headers
+        )
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+async def run(client: AsyncClient, prefix: str, task_ids: list, headers: dict, requests: int) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        writer(client, prefix, task_id, headers, requests) for task_id in task_ids
+    ))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for result, _ in results for latency in result]
+    errors = sum(errors for _, errors in results)
+    return statistics.median(latencies or [0]), len(latencies) / elapsed, errors
+
+
+async def main(requests: int, writers: int, rounds: int = 5) -> None:
+    url = os.environ.get("BENCH_DATABASE_URL") or (
+        f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    )
+    engine = create_async_engine(url)
+    SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.include_router(legacy)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    results = {"/tasks": [], "/legacy-tasks": []}
+    async with AsyncClient(
+        transport=ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://bench",
+    ) as client:
+        res = await client.post("/auth/register", json={
+            "email": "bench@example.com",
+            "password": "benchpass",
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        res = await client.post("/tasks/bulk", json={
+            "items": [{"title": f"Bench task {i}"} for i in range(writers)],
+        }, headers=headers)
+        task_ids = [item["id"] for item in res.json()["items"]]
+
+        for _ in range(rounds):
+            for prefix in results:
+                await run(client, prefix, task_ids, headers, 5)  # warm-up
+                results[prefix].append(
+                    await run(client, prefix, task_ids, headers, requests)
+                )
+
+    await engine.dispose()
+    print(f"PATCH /tasks/{{id}}, {writers} writers x {requests} requests, median of {rounds} rounds")
+    for prefix, label in (("/legacy-tasks", "SELECT + flush"), ("/tasks", "UPDATE ... RETURNING")):
+        p50 = statistics.median(median for median, _, _ in results[prefix])
+        throughput = statistics.median(rate for _, rate, _ in results[prefix])
+        errors = sum(errors for _, _, errors in results[prefix])
+        print(f"  {label:22} p50 {p50:7.2f} ms  {throughput:8.1f} req/s  {errors} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    ))
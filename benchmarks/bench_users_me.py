@@ -0,0 +1,71 @@
+"""Throughput of GET /users/me with and without the verified-token cache.
+
+Runs in-process against a throwaway SQLite database:
+
+    python -m benchmarks.bench_users_me [requests]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.security import verified_tokens  # noqa: E402
+
+
+async def run(client: AsyncClient, headers: dict, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/users/me", headers=headers)
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        res = await client.post("/auth/register", json={
+            "email": "bench@example.com",
+            "password": "benchpass",
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        await run(client, headers, 50)  # warm-up
+
+        maxsize = verified_tokens.maxsize
+        verified_tokens.maxsize = 0
+        verified_tokens.clear()
+        uncached = await run(client, headers, requests)
+
+        verified_tokens.maxsize = maxsize
+        cached = await run(client, headers, requests)
+
+    await engine.dispose()
+    print(f"GET /users/me x{requests}")
+    print(f"  token cache off: {uncached:8.1f} req/s")
+    print(f"  token cache on:  {cached:8.1f} req/s  ({cached / uncached - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
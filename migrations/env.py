@@ -5,7 +5,7 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 from app.database import Base
-from app.models import user, task  # noqa: F401  registers models
+from app.models import user, task, task_tombstone, task_rollup, task_status_change, time_entry  # noqa: F401  registers models
 from app.config import settings
 
 # Alembic Config object
@@ -22,11 +22,24 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Search objects managed outside the models (see app/models/task.py)
+    if reflected and compare_to is None:
+        if type_ == "column" and name == "search_vector":
+            return False
+        if type_ == "index" and name == "ix_tasks_search_vector":
+            return False
+        if type_ == "table" and name.startswith("tasks_fts"):
+            return False
+    return True
+
+
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -37,7 +50,8 @@ def run_migrations_offline() -> None:
 def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
-        target_metadata=target_metadata
+        target_metadata=target_metadata,
+        include_object=include_object,
     )
     with context.begin_transaction():
         context.run_migrations()
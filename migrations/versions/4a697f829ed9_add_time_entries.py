@@ -0,0 +1,40 @@
+"""add time entries
+
+Revision ID: 4a697f829ed9
+Revises: 51c236e1a505
+Create Date: 2026-10-18 17:57:10.184351
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a697f829ed9'
+down_revision: Union[str, Sequence[str], None] = '51c236e1a505'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('time_entries',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('task_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.Column('logged_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('compacted', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_time_entries_task_id_logged_at', 'time_entries', ['task_id', 'logged_at'], unique=False)
+    op.create_index('ix_time_entries_pending', 'time_entries', ['id'], unique=False, postgresql_where=sa.text('NOT compacted'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_time_entries_pending', table_name='time_entries', postgresql_where=sa.text('NOT compacted'))
+    op.drop_index('ix_time_entries_task_id_logged_at', table_name='time_entries')
+    op.drop_table('time_entries')
@@ -0,0 +1,64 @@
+"""add task rollups
+
+Revision ID: 51c236e1a505
+Revises: 8838c44be0f9
+Create Date: 2026-10-18 17:53:33.160810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '51c236e1a505'
+down_revision: Union[str, Sequence[str], None] = '8838c44be0f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_status_rollups',
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'status')
+    )
+    op.create_table('task_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('created', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'owner_id')
+    )
+    op.create_index('ix_task_daily_rollups_owner_id_day', 'task_daily_rollups', ['owner_id', 'day'], unique=False)
+
+    # Backfill from existing tasks. There is no record of when a task was
+    # completed, so done tasks count as completed on their last update.
+    op.execute("""
+        INSERT INTO task_status_rollups (owner_id, status, task_count, total_minutes)
+        SELECT owner_id, status, count(*), coalesce(sum(total_minutes), 0)
+        FROM tasks GROUP BY owner_id, status
+    """)
+    op.execute("""
+        INSERT INTO task_daily_rollups (day, owner_id, created, completed)
+        SELECT day, owner_id, sum(created), sum(completed) FROM (
+            SELECT (created_at AT TIME ZONE 'UTC')::date AS day, owner_id,
+                   1 AS created, 0 AS completed
+            FROM tasks
+            UNION ALL
+            SELECT (updated_at AT TIME ZONE 'UTC')::date, owner_id, 0, 1
+            FROM tasks WHERE status = 'done'
+        ) AS changes
+        GROUP BY day, owner_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_daily_rollups_owner_id_day', table_name='task_daily_rollups')
+    op.drop_table('task_daily_rollups')
+    op.drop_table('task_status_rollups')
@@ -0,0 +1,55 @@
+"""add task change feed
+
+Revision ID: 8838c44be0f9
+Revises: dda04cdd0b60
+Create Date: 2026-10-18 17:50:36.487718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8838c44be0f9'
+down_revision: Union[str, Sequence[str], None] = 'dda04cdd0b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows never updated have no updated_at yet; they last changed when created
+    op.execute("UPDATE tasks SET updated_at = created_at WHERE updated_at IS NULL")
+    op.alter_column(
+        'tasks', 'updated_at',
+        existing_type=sa.DateTime(timezone=True),
+        server_default=sa.text('now()'),
+        nullable=False,
+    )
+    op.create_index('ix_tasks_updated_at_id', 'tasks', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_tasks_owner_id_updated_at_id', 'tasks', ['owner_id', 'updated_at', 'id'], unique=False)
+    op.create_table('task_tombstones',
+    sa.Column('task_id', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstones_deleted_at_task_id', 'task_tombstones', ['deleted_at', 'task_id'], unique=False)
+    op.create_index('ix_task_tombstones_owner_id_deleted_at_task_id', 'task_tombstones', ['owner_id', 'deleted_at', 'task_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_tombstones_owner_id_deleted_at_task_id', table_name='task_tombstones')
+    op.drop_index('ix_task_tombstones_deleted_at_task_id', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_index('ix_tasks_owner_id_updated_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_updated_at_id', table_name='tasks')
+    op.alter_column(
+        'tasks', 'updated_at',
+        existing_type=sa.DateTime(timezone=True),
+        server_default=None,
+        nullable=True,
+    )
@@ -0,0 +1,32 @@
+"""add task keyset pagination indexes
+
+Revision ID: 8f43fa4e0b38
+Revises: d97a06bdffbf
+Create Date: 2026-10-18 16:58:03.107715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f43fa4e0b38'
+down_revision: Union[str, Sequence[str], None] = 'd97a06bdffbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_owner_id_created_at_id', 'tasks', ['owner_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_owner_id_status_created_at_id', 'tasks', ['owner_id', 'status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_owner_id_status_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
@@ -0,0 +1,71 @@
+"""native uuid ids and task status constraint
+
+Revision ID: bae9b723a13e
+Revises: 2b5d0e7c9a41
+Create Date: 2026-10-18 18:13:14.899127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bae9b723a13e'
+down_revision: Union[str, Sequence[str], None] = '2b5d0e7c9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Every column holding a user or task id
+ID_COLUMNS = [
+    ('users', 'id'),
+    ('tasks', 'id'),
+    ('tasks', 'owner_id'),
+    ('task_tombstones', 'task_id'),
+    ('task_tombstones', 'owner_id'),
+    ('task_status_rollups', 'owner_id'),
+    ('task_daily_rollups', 'owner_id'),
+    ('time_entries', 'id'),
+    ('time_entries', 'task_id'),
+    ('time_entries', 'user_id'),
+    ('task_status_history', 'task_id'),
+    ('task_status_history', 'owner_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each ALTER rewrites its table and rebuilds the indexes on it, so this
+    # takes an exclusive lock for a while on large tables
+    op.drop_constraint('tasks_owner_id_fkey', 'tasks', type_='foreignkey')
+    for table, column in ID_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.UUID(as_uuid=False),
+            postgresql_using=f'{column}::uuid',
+        )
+    op.create_foreign_key('tasks_owner_id_fkey', 'tasks', 'users', ['owner_id'], ['id'])
+
+    # Fails if a task holds any other status; fix those rows first
+    op.create_check_constraint(
+        'ck_tasks_status', 'tasks', "status IN ('todo', 'in_progress', 'done')"
+    )
+    op.create_index('ix_tasks_status_created_at_id', 'tasks', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_status_created_at_id', table_name='tasks')
+    op.drop_constraint('ck_tasks_status', 'tasks', type_='check')
+
+    op.drop_constraint('tasks_owner_id_fkey', 'tasks', type_='foreignkey')
+    for table, column in ID_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.String(),
+            postgresql_using=f'{column}::text',
+        )
+    op.create_foreign_key('tasks_owner_id_fkey', 'tasks', 'users', ['owner_id'], ['id'])
@@ -0,0 +1,28 @@
+"""add task version
+
+Revision ID: dda04cdd0b60
+Revises: 8f43fa4e0b38
+Create Date: 2026-10-18 17:38:39.036242
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dda04cdd0b60'
+down_revision: Union[str, Sequence[str], None] = '8f43fa4e0b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks', 'version')
@@ -0,0 +1,49 @@
+"""add task status history
+
+Revision ID: df300f07ee5e
+Revises: 4a697f829ed9
+Create Date: 2026-10-18 17:59:52.779117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'df300f07ee5e'
+down_revision: Union[str, Sequence[str], None] = '4a697f829ed9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_status_history',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('task_id', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('from_status', sa.String(length=20), nullable=True),
+    sa.Column('to_status', sa.String(length=20), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_status_history_to_status_changed_at', 'task_status_history', ['to_status', 'changed_at'], unique=False)
+    op.create_index('ix_task_status_history_owner_id_to_status_changed_at', 'task_status_history', ['owner_id', 'to_status', 'changed_at'], unique=False)
+    op.create_index('ix_task_status_history_task_id_changed_at', 'task_status_history', ['task_id', 'changed_at'], unique=False)
+
+    # Past transitions were never recorded; seed each existing task's
+    # creation so lead times work for tasks completed from now on
+    op.execute("""
+        INSERT INTO task_status_history (task_id, owner_id, from_status, to_status, changed_at)
+        SELECT id, owner_id, NULL, 'todo', coalesce(created_at, now()) FROM tasks
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_status_history_task_id_changed_at', table_name='task_status_history')
+    op.drop_index('ix_task_status_history_owner_id_to_status_changed_at', table_name='task_status_history')
+    op.drop_index('ix_task_status_history_to_status_changed_at', table_name='task_status_history')
+    op.drop_table('task_status_history')
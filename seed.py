@@ -1,9 +1,11 @@
 ﻿import asyncio
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import AsyncSessionLocal, engine, Base
 from app.models.user import User
-from app.models.task import Task
+from app.models.task import TASK_STATUSES, Task
 from app.routers.auth import hash_password
+from app.services.task_rollups import TaskRollups
 
 
 async def seed():
@@ -21,21 +23,28 @@ async def seed():
 
         print("🌱 Seeding database...")
 
+        # Hash all passwords in parallel on the password hashing pool
+        admin_hash, alice_hash, bob_hash = await asyncio.gather(
+            hash_password("admin123"),
+            hash_password("alice123"),
+            hash_password("bob123"),
+        )
+
         # Create admin user
         admin = User(
             email="admin@sprintsync.dev",
-            hashed_password=hash_password("admin123"),
+            hashed_password=admin_hash,
             is_admin=True,
         )
 
         # Create regular users
         alice = User(
             email="alice@sprintsync.dev",
-            hashed_password=hash_password("alice123"),
+            hashed_password=alice_hash,
         )
         bob = User(
             email="bob@sprintsync.dev",
-            hashed_password=hash_password("bob123"),
+            hashed_password=bob_hash,
         )
 
         db.add_all([admin, alice, bob])
@@ -80,7 +89,29 @@ async def seed():
             ),
         ]
 
+        # Back-dated so the board has history: every task starts in todo and
+        # moves one status further every `step` until it reaches its own
+        created_at = datetime.now(timezone.utc) - timedelta(days=5)
+        steps = [timedelta(hours=8 * (i + 1)) for i in range(len(tasks))]
+        for task, step in zip(tasks, steps):
+            task.created_at = created_at
+            task.updated_at = created_at + step * TASK_STATUSES.index(task.status)
+
         db.add_all(tasks)
+        await db.flush()
+
+        # Seeded rows skip the API handlers, and the migrations' backfill ran
+        # before they existed, so the analytics rollups and the status history
+        # are recorded here
+        rollups = TaskRollups()
+        for task, step in zip(tasks, steps):
+            rollups.created(task.id, task.owner_id, TASK_STATUSES[0], task.total_minutes, created_at)
+            for n in range(1, TASK_STATUSES.index(task.status) + 1):
+                rollups.moved(
+                    task.id, task.owner_id, TASK_STATUSES[n - 1], TASK_STATUSES[n],
+                    task.total_minutes, created_at + step * n,
+                )
+        await rollups.apply(db)
         await db.commit()
         print("✅ Seeding complete!")
         print("   admin@sprintsync.dev  /  admin123")
@@ -1,3 +1,7 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
@@ -6,6 +10,15 @@ from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import Base, get_db
 from app.config import settings
+from app.metrics import metrics
+from app.services import ai_service
+from app.services.ai_service import (
+    GroqProvider,
+    breaker,
+    generate_suggestion,
+    set_provider,
+    suggestion_cache,
+)
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_ai.db"
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
@@ -29,6 +42,7 @@ app.dependency_overrides[get_db] = override_get_db
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_db():
+    app.dependency_overrides[get_db] = override_get_db
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -36,6 +50,94 @@ async def setup_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+# Minimal stand-in for Groq's OpenAI-compatible chat completions API
+class StubGroqHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).calls += 1
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": f" Stub for {body['messages'][-1]['content']} ",
+                },
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class GatedProvider:
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def complete(self, title: str) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return f"Suggestion for {title}"
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def live_mode():
+    previous = settings.AI_MODE
+    settings.AI_MODE = "live"
+    suggestion_cache.clear()
+    breaker.reset()
+    yield
+    settings.AI_MODE = previous
+    set_provider(GroqProvider())
+    breaker.reset()
+
+
+@pytest.fixture
+def stub_groq():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGroqHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubGroqHandler.calls = 0
+    previous = (settings.AI_MODE, settings.GROQ_BASE_URL, settings.GROQ_API_KEY)
+    settings.AI_MODE = "live"
+    settings.GROQ_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    settings.GROQ_API_KEY = "test-key"
+    set_provider(GroqProvider())
+    suggestion_cache.clear()
+    yield StubGroqHandler
+    settings.AI_MODE, settings.GROQ_BASE_URL, settings.GROQ_API_KEY = previous
+    server.shutdown()
+    server.server_close()
+
+
+async def get_token(client: AsyncClient) -> str:
+    await client.post("/auth/register", json={
+        "email": "aiuser@example.com",
+        "password": "aipass123"
+    })
+    res = await client.post("/auth/login", json={
+        "email": "aiuser@example.com",
+        "password": "aipass123"
+    })
+    return res.json()["access_token"]
+
+
 @pytest.mark.asyncio
 async def test_ai_suggest_stub():
     # Force stub mode
@@ -66,4 +168,169 @@ async def test_ai_suggest_stub():
     data = response.json()
     assert "suggestion" in data
     assert len(data["suggestion"]) > 0
-    assert data["model"] == "stub"
\ No newline at end of file
+    assert data["model"] == "stub"
+
+
+@pytest.mark.asyncio
+async def test_ai_suggest_live_client_caches_by_normalized_title(stub_groq):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        first = await client.post(
+            "/ai/suggest", json={"title": "Fix auth bug"}, headers=headers
+        )
+        second = await client.post(
+            "/ai/suggest", json={"title": "  fix AUTH   bug"}, headers=headers
+        )
+
+    assert first.status_code == 200
+    assert first.json()["model"] == "llama-3.1-8b-instant"
+    assert first.json()["suggestion"] == "Stub for Task title: Fix auth bug"
+    assert second.json() == first.json()
+    assert stub_groq.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_titles_share_one_upstream_call(live_mode):
+    fake = GatedProvider()
+    set_provider(fake)
+    upstream = metrics["ai_suggest_upstream_total"]
+    coalesced = metrics["ai_suggest_coalesced_total"]
+
+    pending = [
+        asyncio.create_task(generate_suggestion("Fix auth bug"))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    fake.release.set()
+    results = await asyncio.gather(*pending)
+
+    assert fake.calls == 1
+    assert {r["suggestion"] for r in results} == {"Suggestion for Fix auth bug"}
+    assert metrics["ai_suggest_upstream_total"] == upstream + 1
+    assert metrics["ai_suggest_coalesced_total"] == coalesced + 4
+
+
+@pytest.mark.asyncio
+async def test_cancelling_first_caller_leaves_joined_callers_running(live_mode):
+    fake = GatedProvider()
+    set_provider(fake)
+
+    first = asyncio.create_task(generate_suggestion("Fix auth bug"))
+    await asyncio.sleep(0)
+    followers = [
+        asyncio.create_task(generate_suggestion("Fix auth bug"))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    fake.release.set()
+    results = await asyncio.gather(*followers)
+
+    assert fake.calls == 1
+    assert [r["suggestion"] for r in results] == ["Suggestion for Fix auth bug"] * 2
+
+
+@pytest.mark.asyncio
+async def test_ai_suggest_batch_dedupes_and_keeps_order(live_mode):
+    fake = GatedProvider()
+    fake.release.set()
+    set_provider(fake)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        response = await client.post(
+            "/ai/suggest/batch",
+            json={"items": [
+                {"title": "Write docs"},
+                {"title": "Fix auth bug"},
+                {"title": "write  DOCS"},
+            ]},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["suggestion"] for item in items] == [
+        "Suggestion for Write docs",
+        "Suggestion for Fix auth bug",
+        "Suggestion for Write docs",
+    ]
+    assert fake.calls == 2
+
+
+class FailingProvider:
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, title: str) -> str:
+        self.calls += 1
+        raise ConnectionError("provider down")
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_short_circuits_to_fallback(live_mode):
+    fake = FailingProvider()
+    set_provider(fake)
+
+    for i in range(breaker.min_calls):
+        result = await generate_suggestion(f"Failing title {i}")
+        assert result["model"] == "fallback"
+    assert breaker.state == "open"
+    upstream = metrics["ai_suggest_upstream_total"]
+
+    result = await generate_suggestion("Another title")
+
+    assert result["model"] == "fallback"
+    assert fake.calls == breaker.min_calls
+    # Short-circuited: no upstream call made or counted
+    assert metrics["ai_suggest_upstream_total"] == upstream
+
+
+class SlowProvider:
+    model = "fake"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def complete(self, title: str) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return f"Suggestion for {title}"
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_a_concurrency_slot_is_not_a_slow_call(live_mode, monkeypatch):
+    monkeypatch.setattr(settings, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_service, "_slots_loop", None)
+    monkeypatch.setattr(breaker, "slow_call_seconds", 0.1)
+    fake = SlowProvider(delay=0.03)
+    set_provider(fake)
+
+    # Each call takes 0.03s, but queued behind each other the last one
+    # finishes after 0.03s * min_calls * 2, well past slow_call_seconds
+    titles = [f"Queued title {i}" for i in range(breaker.min_calls * 2)]
+    results = await asyncio.gather(*(generate_suggestion(t) for t in titles))
+
+    assert [r["model"] for r in results] == ["fake"] * len(titles)
+    assert fake.max_running == 1
+    assert breaker.state == "closed"
+    assert breaker.failure_rate == 0
@@ -0,0 +1,163 @@
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.models.task_status_change import TaskStatusChange
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_analytics.db"
+test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+TestSessionLocal = sessionmaker(
+    bind=test_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    app.dependency_overrides[get_db] = override_get_db
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+async def register(client: AsyncClient, email: str) -> dict:
+    res = await client.post("/auth/register", json={
+        "email": email,
+        "password": "pass123",
+    })
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_summary_follows_task_writes():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        headers = await register(client, "analyst@example.com")
+        other_headers = await register(client, "bystander@example.com")
+        await client.post("/tasks/", json={"title": "Not counted"}, headers=other_headers)
+
+        ids = [
+            (await client.post("/tasks/", json={
+                "title": f"Rolled up {i}", "total_minutes": 10 * i,
+            }, headers=headers)).json()["id"]
+            for i in range(3)
+        ]
+        bulk = (await client.post("/tasks/bulk", json={
+            "items": [{"title": "Bulk one", "total_minutes": 5}, {"title": "Bulk two"}],
+        }, headers=headers)).json()
+        ids += [item["id"] for item in bulk["items"]]
+
+        await client.patch(f"/tasks/{ids[0]}/status", json={"status": "in_progress"}, headers=headers)
+        await client.patch(f"/tasks/{ids[0]}/status", json={"status": "done"}, headers=headers)
+        await client.patch("/tasks/bulk/status", json={"items": [
+            {"id": ids[3], "status": "in_progress"},
+            {"id": ids[3], "status": "done"},
+        ]}, headers=headers)
+        await client.patch(f"/tasks/{ids[1]}", json={"total_minutes": 45}, headers=headers)
+        await client.patch("/tasks/bulk", json={"items": [
+            {"id": ids[4], "total_minutes": 7},
+        ]}, headers=headers)
+        await client.delete(f"/tasks/{ids[2]}", headers=headers)
+
+        tasks = (await client.get("/tasks/", headers=headers)).json()
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            res = await client.get("/analytics/summary", headers=headers)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+        bad_range = await client.get(
+            "/analytics/summary?start=2026-02-01&end=2026-01-01", headers=headers
+        )
+
+    assert res.status_code == 200
+    summary = res.json()
+    assert summary["by_status"] == dict(Counter(task["status"] for task in tasks))
+    assert summary["by_status"] == {"todo": 2, "done": 2}
+    assert summary["total_minutes"] == sum(task["total_minutes"] for task in tasks) == 57
+    [owner] = summary["by_owner"]
+    assert owner["task_count"] == 4
+    today = datetime.now(timezone.utc).date().isoformat()
+    assert summary["end"] == today
+    assert summary["throughput"][-1] == {"day": today, "created": 5, "completed": 2}
+    assert len(summary["throughput"]) == 30
+    # Served from the rollups, without reading the tasks table
+    assert not [s for s in statements if re.search(r"\btasks\b", s)]
+    assert bad_range.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_status_history_and_cycle_time_percentiles():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        headers = await register(client, "cycler@example.com")
+        user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+        task_id = (await client.post(
+            "/tasks/", json={"title": "Tracked task"}, headers=headers
+        )).json()["id"]
+        for status in ("in_progress", "done"):
+            await client.patch(f"/tasks/{task_id}/status", json={"status": status}, headers=headers)
+
+        async with TestSessionLocal() as session:
+            history = (await session.execute(
+                select(TaskStatusChange.from_status, TaskStatusChange.to_status)
+                .where(TaskStatusChange.task_id == task_id)
+                .order_by(TaskStatusChange.changed_at)
+            )).all()
+            # Ten tasks finished in January: lead times of 1..10 hours, each
+            # started half an hour after creation
+            base = datetime(2026, 1, 10, 9, tzinfo=timezone.utc)
+            rows = []
+            for hours in range(1, 11):
+                for old, new, offset in (
+                    (None, "todo", 0),
+                    ("todo", "in_progress", 0.5),
+                    ("in_progress", "done", hours),
+                ):
+                    rows.append({
+                        "task_id": f"00000000-0000-4000-8000-{hours:012d}",
+                        "owner_id": user_id,
+                        "from_status": old,
+                        "to_status": new,
+                        "changed_at": base + timedelta(hours=offset),
+                    })
+            await session.execute(insert(TaskStatusChange).values(rows))
+            await session.commit()
+
+        report = (await client.get(
+            "/analytics/cycle-time?start=2026-01-01&end=2026-01-31", headers=headers
+        )).json()
+        today = (await client.get("/analytics/cycle-time", headers=headers)).json()
+
+    assert history == [(None, "todo"), ("todo", "in_progress"), ("in_progress", "done")]
+    [owner] = report["owners"]
+    assert owner["owner_id"] == user_id
+    assert owner["lead_time"] == {
+        "count": 10, "avg_hours": 5.5, "p50_hours": 5, "p85_hours": 9, "p95_hours": 10,
+    }
+    assert owner["cycle_time"] == {
+        "count": 10, "avg_hours": 5.0, "p50_hours": 4.5, "p85_hours": 8.5, "p95_hours": 9.5,
+    }
+    assert today["owners"][0]["lead_time"]["count"] == 1
+
@@ -1,10 +1,16 @@
+import asyncio
+import threading
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
+from app.config import settings
 from app.database import Base, get_db
+from app.metrics import metrics
+from app.services.hash_pool import run_in_hash_pool
+from app.security import verified_tokens
 
 # Use in-memory SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -30,6 +36,7 @@ app.dependency_overrides[get_db] = override_get_db
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_db():
+    app.dependency_overrides[get_db] = override_get_db
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -85,4 +92,69 @@ async def test_login_wrong_password():
             "email": "test@example.com",
             "password": "wrongpassword"
         })
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached_and_tampering_rejected():
+    verified_tokens.clear()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        res = await client.post("/auth/register", json={
+            "email": "test@example.com",
+            "password": "testpass123"
+        })
+        token = res.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        await client.get("/users/me", headers=headers)
+        hits_before = verified_tokens.hits
+        response = await client.get("/users/me", headers=headers)
+        tampered = await client.get(
+            "/users/me", headers={"Authorization": f"Bearer {token}x"}
+        )
+
+    assert response.status_code == 200
+    assert verified_tokens.hits == hits_before + 1
+    assert tampered.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_sheds_load_when_hash_pool_is_full():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.post("/auth/register", json={
+            "email": "test@example.com",
+            "password": "testpass123"
+        })
+        max_queue = settings.PASSWORD_HASH_MAX_QUEUE
+        settings.PASSWORD_HASH_MAX_QUEUE = 0
+        try:
+            response = await client.post("/auth/login", json={
+                "email": "test@example.com",
+                "password": "testpass123"
+            })
+        finally:
+            settings.PASSWORD_HASH_MAX_QUEUE = max_queue
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hash_caller_keeps_job_counted_until_it_finishes():
+    release = threading.Event()
+    depth = metrics["password_hash_queue_depth"]
+    caller = asyncio.create_task(run_in_hash_pool(release.wait, 5))
+    await asyncio.sleep(0.05)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+
+    # The bcrypt job is still occupying a worker
+    assert metrics["password_hash_queue_depth"] == depth + 1
+    release.set()
+    async with asyncio.timeout(5):
+        while metrics["password_hash_queue_depth"] != depth:
+            await asyncio.sleep(0.01)
@@ -0,0 +1,74 @@
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_rate_threshold=0.5,
+        slow_call_seconds=2.0,
+        window_size=4,
+        min_calls=4,
+        open_seconds=10.0,
+        clock=clock,
+    )
+
+
+def test_trips_on_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for success in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success, 0.1)
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+    assert not breaker.allow()
+
+    clock.now += 10.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record(True, 0.1)
+
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures_and_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for _ in range(4):
+        breaker.record(True, 5.0)
+    assert breaker.state == "open"
+
+    clock.now += 10.0
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+
+
+@pytest.mark.asyncio
+async def test_call_raises_while_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    async def boom():
+        raise RuntimeError("down")
+
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            await breaker.call(boom)
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(boom)
+    assert breaker.short_circuits == 1
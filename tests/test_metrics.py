@@ -0,0 +1,352 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.main import app
+from app.config import settings
+from app.database import Base, InstrumentedPool, engine_options, get_db, instrument_engine
+from app.metrics import (
+    GAUGES,
+    LatencyHistogram,
+    MmapSegment,
+    RequestDBStats,
+    collect,
+    current_request_db,
+    latency,
+    metrics,
+    read_segment,
+    route_db,
+    statement_template,
+    statements,
+)
+from app.middleware import BatchingStderrHandler, JsonFormatter, access_line
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_checkouts():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///./test_metrics.db",
+        poolclass=InstrumentedPool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    instrument_engine(engine)
+    before = metrics["db_pool_checkouts_total"]
+    checked_out = metrics["db_pool_checked_out"]
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert engine.pool.checkedout() == 1
+        assert metrics["db_pool_checked_out"] == checked_out + 1
+    await engine.dispose()
+
+    assert metrics["db_pool_checkouts_total"] == before + 1
+    assert metrics["db_pool_checked_out"] == checked_out
+    assert metrics["db_pool_wait_ms_max"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_engine_options_leave_sqlite_memory_pool_alone():
+    url = "sqlite+aiosqlite://"
+    engine = create_async_engine(url, **engine_options(url))
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE kept (id INTEGER)"))
+    # Same single connection, so the table is still there
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT * FROM kept"))
+    await engine.dispose()
+
+    assert not isinstance(engine.pool, InstrumentedPool)
+
+
+def test_engine_options_size_both_asyncpg_statement_caches():
+    options = engine_options("postgresql+asyncpg://user:pass@db/app")
+
+    assert options["poolclass"] is InstrumentedPool
+    assert options["connect_args"] == {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+@pytest.mark.asyncio
+async def test_logging_middleware_counts_requests():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        before = metrics["http_requests_total"]
+        response = await client.get("/")
+
+    assert response.status_code == 200
+    assert metrics["http_requests_total"] == before + 1
+    assert latency[("GET", "/", 200)].count >= 1
+
+
+def test_json_formatter_renders_dict_messages():
+    record = logging.LogRecord(
+        "sprintsync", logging.INFO, __file__, 1,
+        {"path": "/", "status_code": 200}, None, None,
+    )
+
+    line = json.loads(JsonFormatter("%(message)s").format(record))
+
+    assert line["path"] == "/"
+    assert line["status_code"] == 200
+    assert "timestamp" in line
+
+
+def test_access_line_is_json():
+    line = access_line(
+        1760000000.25, "GET", '/tasks/"caf\u00e9"', "anonymous", 404, 1.236, 2, 0.5,
+    )
+
+    assert json.loads(line) == {
+        "timestamp": "2025-10-09T08:53:20.250000+00:00",
+        "method": "GET",
+        "path": '/tasks/"caf\u00e9"',
+        "user_id": "anonymous",
+        "status_code": 404,
+        "latency_ms": 1.24,
+        "db_queries": 2,
+        "db_ms": 0.5,
+    }
+
+
+def test_batching_handler_writes_once_queue_is_drained(monkeypatch):
+    writes = []
+
+    class Stream:
+        def write(self, text):
+            writes.append(text)
+
+        def flush(self):
+            pass
+
+    monkeypatch.setattr("sys.stderr", Stream())
+    pending = queue.SimpleQueue()
+    handler = BatchingStderrHandler(pending)
+    handler.setFormatter(JsonFormatter("%(message)s"))
+    pending.put("more to come")
+    for i in range(3):
+        handler.handle(logging.LogRecord(
+            "sprintsync", logging.INFO, __file__, 1, {"n": i}, None, None,
+        ))
+    assert writes == []
+
+    pending.get()
+    handler.handle(logging.LogRecord(
+        "sprintsync", logging.INFO, __file__, 1, {"n": 3}, None, None,
+    ))
+
+    assert len(writes) == 1
+    assert [json.loads(line)["n"] for line in writes[0].splitlines()] == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_pool_status():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    pool = response.json()["db_pool"]
+    assert {"size", "checked_out", "overflow", "avg_wait_ms"} <= set(pool)
+
+
+def test_latency_histogram_quantiles():
+    histogram = LatencyHistogram(buckets=(10, 100, 1000))
+    for _ in range(90):
+        histogram.observe(5)
+    for _ in range(10):
+        histogram.observe(500)
+
+    assert histogram.quantile(0.5) < 10
+    assert 100 < histogram.quantile(0.99) <= 1000
+    assert histogram.summary()["count"] == 100
+
+
+@pytest.mark.asyncio
+async def test_metrics_keyed_by_route_template_with_prometheus_output():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        await client.get("/tasks/some-task-id")
+        await client.get("/tasks/other-task-id")
+        json_res = await client.get("/metrics")
+        prom_res = await client.get("/metrics/prometheus")
+
+    routes = json_res.json()["route_latency"]
+    assert "GET /tasks/{task_id}" in routes
+    assert not any("some-task-id" in route for route in routes)
+    assert routes["GET /tasks/{task_id}"]["403"]["count"] >= 2
+
+    assert prom_res.headers["content-type"].startswith("text/plain")
+    text = prom_res.text
+    assert "# TYPE sprintsync_http_request_duration_seconds histogram" in text
+    assert "# TYPE sprintsync_http_request_latency_ms_total counter" in text
+    assert (
+        'sprintsync_http_request_duration_seconds_count{method="GET",'
+        'route="/tasks/{task_id}",status="403"}'
+    ) in text
+
+
+def test_running_totals_are_named_as_counters():
+    # render_prometheus types a metric by its _total suffix
+    totals = [name for name in metrics if name not in GAUGES and not name.endswith("_max")]
+
+    assert [name for name in totals if not name.endswith("_total")] == []
+
+
+def test_exited_worker_keeps_counters_but_not_gauges(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    exited = context.Process(target=int)
+    exited.start()
+    exited.join(timeout=60)
+    stale = MmapSegment(str(tmp_path / f"metrics_{exited.pid}.db"))
+    stale.write("http_requests_total", 4)
+    stale.write("task_stream_connections", 3)
+    stale.write("time_log_buffered", 9)
+    live = MmapSegment(str(tmp_path / f"metrics_{os.getpid()}.db"))
+    live.write("http_requests_total", 1)
+    live.write("task_stream_connections", 2)
+
+    values, _, _ = collect(str(tmp_path))
+
+    assert values["http_requests_total"] == 5
+    assert values["task_stream_connections"] == 2
+    assert values["time_log_buffered"] == 0
+
+
+def test_mmap_segment_grows_and_reopens(tmp_path):
+    path = str(tmp_path / "metrics_1.db")
+    segment = MmapSegment(path)
+    for i in range(5000):
+        segment.write(f"counter_{i}_total", i)
+    segment.write("counter_7_total", 70)
+
+    reopened = MmapSegment(path)
+    reopened.write("counter_8_total", 80)
+    values = dict(read_segment(path))
+
+    assert len(values) == 5000
+    assert values["counter_4999_total"] == 4999
+    assert values["counter_7_total"] == 70
+    assert values["counter_8_total"] == 80
+
+
+# Runs in a separate worker process
+def record_worker_traffic(requests: int):
+    from app.metrics import RequestDBStats, metrics, observe_request, observe_request_db
+
+    for _ in range(requests):
+        metrics["http_requests_total"] += 1
+        observe_request("GET", "/tasks/", 200, 20)
+        db_stats = RequestDBStats("GET", "/tasks/")
+        db_stats.queries, db_stats.db_ms = 2, 5
+        observe_request_db("GET", "/tasks/", db_stats, 20)
+    metrics["db_pool_wait_ms_max"] = requests
+
+
+def test_metrics_aggregate_across_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=record_worker_traffic, args=(requests,))
+        for requests in (3, 5, 7)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    values, histograms, db = collect(str(tmp_path))
+
+    assert len(list(tmp_path.glob("metrics_*.db"))) == 3
+    assert values["http_requests_total"] == 15
+    assert values["db_pool_wait_ms_max"] == 7
+    histogram = histograms[("GET", "/tasks/", 200)]
+    assert histogram.count == 15
+    assert histogram.sum == 300
+    route = db["routes"][("GET", "/tasks/")]
+    assert route["requests"] == 15
+    assert route["queries"] == 30
+    assert route["queries_max"] == 2
+
+
+def test_statement_template_folds_varying_parts():
+    assert statement_template(
+        "SELECT tasks.id FROM tasks\n WHERE tasks.id IN ($1, $2, $3)"
+    ) == "SELECT tasks.id FROM tasks WHERE tasks.id IN (...)"
+    assert statement_template(
+        "INSERT INTO tasks (id, title) VALUES (?, ?), (?, ?), (?, ?)"
+    ) == "INSERT INTO tasks (id, title) VALUES (?, ?), ..."
+
+
+@pytest.mark.asyncio
+async def test_query_hooks_attribute_db_time_to_request(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///./test_metrics.db")
+    instrument_engine(engine)
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1e-6)
+    slow_before = metrics["db_slow_queries_total"]
+
+    db_stats = RequestDBStats("GET", "/tasks/")
+    token = current_request_db.set(db_stats)
+    try:
+        async with engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT 42"))
+    finally:
+        current_request_db.reset(token)
+    await engine.dispose()
+
+    assert db_stats.queries == 3
+    assert db_stats.db_ms > 0
+    assert statements["SELECT 42"]["count"] >= 3
+    assert metrics["db_slow_queries_total"] >= slow_before + 3
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_db_time_per_route():
+    engine = create_async_engine("sqlite+aiosqlite:///./test_metrics.db")
+    SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # After the schema DDL, which would crowd the statement report
+    instrument_engine(engine)
+    # Earlier tests register users on uninstrumented engines
+    route_db.pop(("POST", "/auth/register"), None)
+
+    async def override_get_db():
+        async with SessionLocal() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            await client.post("/auth/register", json={
+                "email": "metrics@example.com",
+                "password": "pass123",
+            })
+            response = await client.get("/metrics")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        await engine.dispose()
+
+    db = response.json()["db"]
+    route = db["routes"]["POST /auth/register"]
+    assert route["requests"] >= 1
+    assert route["max_queries_per_request"] >= 2
+    assert 0 < route["db_time_ratio"] <= 1
+    assert any(s["statement"].startswith("INSERT INTO users") for s in db["statements"])
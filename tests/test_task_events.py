@@ -0,0 +1,45 @@
+import pytest
+from app.models.user import User
+from app.services.task_events import RESYNC, Subscription, TaskEventHub, LocalTaskEventBroker
+
+
+def event(owner_id: str, title: str) -> dict:
+    return {"type": "created", "owner_id": owner_id, "task": {"title": title}}
+
+
+@pytest.mark.asyncio
+async def test_events_reach_owner_and_admins_only():
+    hub = TaskEventHub(LocalTaskEventBroker())
+    owner = hub.subscribe(User(id="owner", is_admin=False))
+    other = hub.subscribe(User(id="other", is_admin=False))
+    admin = hub.subscribe(User(id="admin", is_admin=True))
+
+    await hub.publish([event("owner", "Mine")])
+
+    assert "Mine" in await owner.get(timeout=1)
+    assert "Mine" in await admin.get(timeout=1)
+    assert await other.get(timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_told_to_resync():
+    subscription = Subscription(User(id="owner", is_admin=False), maxsize=2)
+    for i in range(5):
+        subscription.put(f"frame {i}")
+
+    assert await subscription.get(timeout=1) is RESYNC
+    assert await subscription.get(timeout=0.01) is None
+
+    subscription.put("frame 5")
+    assert await subscription.get(timeout=1) == "frame 5"
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_on_stream_close():
+    hub = TaskEventHub(LocalTaskEventBroker())
+    stream = hub.stream(User(id="owner", is_admin=False))
+
+    assert "event: ready" in await stream.__anext__()
+    assert "owner" in hub.by_owner
+    await stream.aclose()
+    assert hub.by_owner == {}
@@ -1,10 +1,20 @@
+import asyncio
+import csv
+import io
+import json
+import re
+import time
+from datetime import datetime
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, update
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_session_factory
+from app.routers.tasks import encode_cursor
+from app.models.user import User
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_tasks.db"
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
@@ -28,6 +38,8 @@ app.dependency_overrides[get_db] = override_get_db
 
 @pytest_asyncio.fixture(autouse=True)
 async def setup_db():
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestSessionLocal
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -107,4 +119,599 @@ async def test_invalid_status_transition():
             json={"status": "done"},
             headers={"Authorization": f"Bearer {token}"},
         )
-    assert response.status_code == 400
\ No newline at end of file
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_keyset_pagination():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(5):
+            await client.post(
+                "/tasks/",
+                json={"title": f"Paged task {i}"},
+                headers=headers,
+            )
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/tasks/", params=params, headers=headers)
+            assert response.status_code == 200
+            seen.extend(task["title"] for task in response.json())
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    assert pages == 3
+    assert seen == [f"Paged task {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_filter_and_fields():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/tasks/", json={"title": "Todo task"}, headers=headers)
+        await client.post(
+            "/tasks/",
+            json={"title": "Busy task", "status": "in_progress"},
+            headers=headers,
+        )
+
+        response = await client.get(
+            "/tasks/",
+            params={"status": "in_progress", "fields": "id,title"},
+            headers=headers,
+        )
+        bad = await client.get(
+            "/tasks/", params={"fields": "title,password"}, headers=headers
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert set(data[0]) == {"id", "title"}
+    assert data[0]["title"] == "Busy task"
+    assert bad.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_tasks_streams_ndjson_and_csv():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(3):
+            await client.post(
+                "/tasks/", json={"title": f"Export task {i}"}, headers=headers
+            )
+
+        ndjson_res = await client.get("/tasks/export", headers=headers)
+        csv_res = await client.get(
+            "/tasks/export", params={"format": "csv"}, headers=headers
+        )
+
+    assert ndjson_res.status_code == 200
+    assert ndjson_res.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson_res.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Export task {i}" for i in range(3)]
+
+    assert csv_res.status_code == 200
+    records = list(csv.DictReader(io.StringIO(csv_res.text)))
+    assert len(records) == 3
+    assert records[0]["status"] == "todo"
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_update_and_status():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        create_res = await client.post("/tasks/bulk", json={"items": [
+            {"title": "Bulk task one"},
+            {"title": "Bulk task two", "total_minutes": 30},
+        ]}, headers=headers)
+        ids = [item["id"] for item in create_res.json()["items"]]
+
+        update_res = await client.patch("/tasks/bulk", json={"items": [
+            {"id": ids[0], "title": "Renamed bulk task"},
+            {"id": "missing-task-id", "title": "Nobody home"},
+        ]}, headers=headers)
+        status_res = await client.patch("/tasks/bulk/status", json={"items": [
+            {"id": ids[0], "status": "in_progress"},
+            {"id": ids[0], "status": "done"},
+            {"id": ids[1], "status": "done"},
+        ]}, headers=headers)
+        tasks_res = await client.get("/tasks/", headers=headers)
+
+    assert create_res.status_code == 201
+    assert [item["status_code"] for item in create_res.json()["items"]] == [201, 201]
+    assert create_res.json()["items"][1]["task"]["total_minutes"] == 30
+
+    assert update_res.status_code == 200
+    results = update_res.json()["items"]
+    assert results[0]["task"]["title"] == "Renamed bulk task"
+    assert results[1] == {
+        "id": "missing-task-id", "status_code": 404, "task": None,
+        "detail": "Task not found",
+    }
+
+    assert [item["status_code"] for item in status_res.json()["items"]] == [200, 200, 400]
+    stored = {task["id"]: task for task in tasks_res.json()}
+    assert stored[ids[0]]["title"] == "Renamed bulk task"
+    assert stored[ids[0]]["status"] == "done"
+    assert stored[ids[1]]["status"] == "todo"
+
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_oversized_batches():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        response = await client.post(
+            "/tasks/bulk",
+            json={"items": [{"title": f"Task {i}"} for i in range(201)]},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_distinguish_missing_and_forbidden():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        other = await client.post("/auth/register", json={
+            "email": "otheruser@example.com",
+            "password": "pass123",
+        })
+        other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+        task_id = (await client.post(
+            "/tasks/", json={"title": "Writable task"}, headers=headers
+        )).json()["id"]
+
+        update_res = await client.patch(
+            f"/tasks/{task_id}", json={"title": "Rewritten task"}, headers=headers
+        )
+        forbidden_res = await client.patch(
+            f"/tasks/{task_id}", json={"title": "Not mine"}, headers=other_headers
+        )
+        forbidden_delete = await client.delete(f"/tasks/{task_id}", headers=other_headers)
+        delete_res = await client.delete(f"/tasks/{task_id}", headers=headers)
+        missing_res = await client.patch(
+            f"/tasks/{task_id}/status", json={"status": "in_progress"}, headers=headers
+        )
+
+    assert update_res.status_code == 200
+    assert update_res.json()["title"] == "Rewritten task"
+    assert update_res.json()["updated_at"] is not None
+    assert forbidden_res.status_code == 403
+    assert forbidden_delete.status_code == 403
+    assert delete_res.status_code == 204
+    assert missing_res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_etag_conditional_reads_and_writes():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        create_res = await client.post(
+            "/tasks/", json={"title": "Versioned task"}, headers=headers
+        )
+        task_id = create_res.json()["id"]
+        etag = create_res.headers["ETag"]
+
+        not_modified = await client.get(
+            f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag}
+        )
+        first_move = await client.patch(
+            f"/tasks/{task_id}/status",
+            json={"status": "in_progress"},
+            headers={**headers, "If-Match": etag},
+        )
+        # A second client still holding the old ETag loses
+        stale_move = await client.patch(
+            f"/tasks/{task_id}",
+            json={"title": "Stale rename"},
+            headers={**headers, "If-Match": etag},
+        )
+        fresh_get = await client.get(
+            f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag}
+        )
+
+    assert create_res.json()["version"] == 1
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert first_move.status_code == 200
+    assert first_move.json()["version"] == 2
+    assert first_move.headers["ETag"] == '"2"'
+    assert stale_move.status_code == 412
+    assert stale_move.headers["ETag"] == '"2"'
+    assert fresh_get.status_code == 200
+    assert fresh_get.json()["title"] == "Versioned task"
+
+
+@pytest.mark.asyncio
+async def test_task_list_conditional_get_and_cache():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/tasks/", json={"title": "Polled task"}, headers=headers)
+        # Last-Modified only vouches for seconds that have fully passed
+        await asyncio.sleep(1.01 - time.time() % 1)
+
+        first = await client.get("/tasks/", headers=headers)
+        etag = first.headers["ETag"]
+        unchanged = await client.get(
+            "/tasks/", headers={**headers, "If-None-Match": etag}
+        )
+        since = await client.get(
+            "/tasks/",
+            headers={**headers, "If-Modified-Since": first.headers["Last-Modified"]},
+        )
+
+        # Served from the response cache: no query reaches the database
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+        cached = await client.get("/tasks/", headers=headers)
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+
+        await client.post("/tasks/", json={"title": "Second task"}, headers=headers)
+        changed = await client.get(
+            "/tasks/", headers={**headers, "If-None-Match": etag}
+        )
+
+    assert etag.startswith('W/"')
+    assert unchanged.status_code == 304
+    assert since.status_code == 304
+    assert cached.status_code == 200
+    assert statements == []
+    assert cached.content == first.content
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [task["title"] for task in changed.json()] == ["Polled task", "Second task"]
+
+
+@pytest.mark.asyncio
+async def test_if_modified_since_sees_write_in_the_same_second():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/tasks/", json={"title": "First"}, headers=headers)
+        first = await client.get("/tasks/", headers=headers)
+        await client.post("/tasks/", json={"title": "Second"}, headers=headers)
+        since = await client.get(
+            "/tasks/",
+            headers={**headers, "If-Modified-Since": first.headers["Last-Modified"]},
+        )
+
+    assert since.status_code == 200
+    assert [task["title"] for task in since.json()] == ["First", "Second"]
+
+
+async def wait_for_text(chunks: list, text: str, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while text not in "".join(chunks):
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_task_stream_pushes_changes():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        ticket = (await client.post("/tasks/stream/ticket", headers=headers)).json()["ticket"]
+
+        # httpx's ASGI transport buffers whole responses, so drive the
+        # endpoint directly and disconnect once the events are in
+        chunks, disconnected = [], asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b"").decode())
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/tasks/stream",
+            "raw_path": b"/tasks/stream", "root_path": "",
+            "query_string": f"ticket={ticket}".encode(),
+            "headers": [(b"host", b"test")], "client": ("test", 1),
+            "server": ("test", 80), "state": {},
+        }
+        stream = asyncio.create_task(app(scope, receive, send))
+        await wait_for_text(chunks, "event: ready")
+
+        task_id = (await client.post(
+            "/tasks/", json={"title": "Streamed task"}, headers=headers
+        )).json()["id"]
+        await client.patch(
+            f"/tasks/{task_id}/status", json={"status": "in_progress"}, headers=headers
+        )
+        await client.delete(f"/tasks/{task_id}", headers=headers)
+        await wait_for_text(chunks, "event: deleted")
+
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
+        unauthorized = await client.get("/tasks/stream?ticket=not-a-jwt")
+        # The long-lived JWT doesn't open the stream from the URL, and a
+        # ticket is no bearer token
+        jwt_in_url = await client.get(f"/tasks/stream?ticket={token}")
+        ticket_as_bearer = await client.get(
+            "/users/me", headers={"Authorization": f"Bearer {ticket}"}
+        )
+
+    events = [
+        (frame.split("event: ")[1].split("\n")[0], frame.split("data: ")[1])
+        for frame in "".join(chunks).split("\n\n") if "event: " in frame
+    ]
+    assert [name for name, _ in events] == ["ready", "created", "status", "deleted"]
+    assert json.loads(events[1][1])["title"] == "Streamed task"
+    assert json.loads(events[2][1])["status"] == "in_progress"
+    assert json.loads(events[3][1]) == {"id": task_id, "owner_id": json.loads(events[1][1])["owner_id"]}
+    assert unauthorized.status_code == 401
+    assert jwt_in_url.status_code == 401
+    assert ticket_as_bearer.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_task_changes_feed(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "TASK_CHANGES_SETTLE_SECONDS", 0)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        task_ids = [
+            (await client.post(
+                "/tasks/", json={"title": f"Synced task {i}"}, headers=headers
+            )).json()["id"]
+            for i in range(3)
+        ]
+
+        first = (await client.get("/tasks/changes?limit=2", headers=headers)).json()
+        second = (await client.get(
+            f"/tasks/changes?limit=2&since={first['cursor']}", headers=headers
+        )).json()
+        idle = (await client.get(
+            f"/tasks/changes?since={second['cursor']}", headers=headers
+        )).json()
+
+        await client.patch(
+            f"/tasks/{task_ids[0]}", json={"title": "Renamed offline"}, headers=headers
+        )
+        await client.delete(f"/tasks/{task_ids[1]}", headers=headers)
+        changes = (await client.get(
+            f"/tasks/changes?since={idle['cursor']}", headers=headers
+        )).json()
+
+        expired = await client.get(
+            "/tasks/changes?since=" + encode_cursor(datetime(2000, 1, 1), ""),
+            headers=headers,
+        )
+        invalid = await client.get("/tasks/changes?since=bogus", headers=headers)
+
+    assert [task["id"] for task in first["changed"]] == task_ids[:2]
+    assert first["has_more"] is True
+    assert [task["id"] for task in second["changed"]] == task_ids[2:]
+    assert second["has_more"] is False
+    assert idle["changed"] == [] and idle["deleted"] == []
+    assert [task["title"] for task in changes["changed"]] == ["Renamed offline"]
+    assert [tombstone["id"] for tombstone in changes["deleted"]] == [task_ids[1]]
+    assert expired.status_code == 410
+    assert invalid.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_time_entries_are_buffered_then_compacted():
+    from app.services.time_log import time_log
+
+    time_log.buffer.clear()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        task_id = (await client.post(
+            "/tasks/", json={"title": "Timed task", "total_minutes": 5}, headers=headers
+        )).json()["id"]
+
+        logged = await asyncio.gather(*(
+            client.post(f"/tasks/{task_id}/time", json={"minutes": minutes}, headers=headers)
+            for minutes in (10, 20, 30)
+        ))
+        missing = await client.post("/tasks/nope/time", json={"minutes": 5}, headers=headers)
+        invalid = await client.post(f"/tasks/{task_id}/time", json={"minutes": 0}, headers=headers)
+        buffered = len(time_log.buffer)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            flushed = await time_log.flush(TestSessionLocal)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+        before = (await client.get(f"/tasks/{task_id}", headers=headers)).json()
+        compacted = await time_log.compact(TestSessionLocal)
+        after = (await client.get(f"/tasks/{task_id}", headers=headers)).json()
+        recompacted = await time_log.compact(TestSessionLocal)
+
+        # Shutdown flushes and compacts whatever is still buffered
+        time_log.start(TestSessionLocal)
+        await client.post(f"/tasks/{task_id}/time", json={"minutes": 1}, headers=headers)
+        await time_log.stop()
+        final = (await client.get(f"/tasks/{task_id}", headers=headers)).json()
+
+    assert [res.status_code for res in logged] == [202, 202, 202]
+    assert logged[0].json()["task_id"] == task_id
+    assert missing.status_code == 404
+    assert invalid.status_code == 422
+    assert buffered == flushed == 3
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    assert before["total_minutes"] == 5
+    assert compacted == 3 and recompacted == 0
+    assert after["total_minutes"] == 65
+    assert after["version"] == before["version"] + 1
+    assert final["total_minutes"] == 66
+
+
+def test_time_log_compaction_binds_task_ids_as_uuid_on_postgres():
+    from sqlalchemy.dialects.postgresql import asyncpg
+    from app.services.time_log import add_minutes
+
+    sql = str(add_minutes({
+        "6f1c9e5a-2b7d-4c1e-9a3f-0d8e7b6a5c41": 10,
+        "0b2d4f6a-8c1e-4a3b-9d5f-7e9a1c3b5d72": 20,
+    }).compile(dialect=asyncpg.dialect()))
+
+    assert "VARCHAR" not in sql
+    assert sql.count("WHEN $") == sql.count("::UUID THEN") == 2
+
+
+@pytest.mark.asyncio
+async def test_search_tasks_ranks_and_scopes_matches():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        other = await client.post("/auth/register", json={
+            "email": "searcher@example.com",
+            "password": "pass123",
+        })
+        other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+        await client.post("/tasks/", json={"title": "Database backups"}, headers=other_headers)
+
+        described = (await client.post("/tasks/", json={
+            "title": "Nightly chores", "description": "Rotate database backups",
+        }, headers=headers)).json()["id"]
+        titled = (await client.post("/tasks/", json={
+            "title": "Database backups", "description": "Verify restores",
+        }, headers=headers)).json()["id"]
+        await client.post("/tasks/", json={"title": "Unrelated work"}, headers=headers)
+
+        ranked = await client.get("/tasks/search?q=database%20backups", headers=headers)
+        first = await client.get("/tasks/search?q=backups&limit=1", headers=headers)
+        second = await client.get(
+            f"/tasks/search?q=backups&limit=1&cursor={first.headers['x-next-cursor']}",
+            headers=headers,
+        )
+
+        await client.patch(f"/tasks/{titled}", json={"title": "Restore drills"}, headers=headers)
+        await client.delete(f"/tasks/{described}", headers=headers)
+        after_writes = await client.get("/tasks/search?q=backups", headers=headers)
+        renamed = await client.get("/tasks/search?q=drills", headers=headers)
+        no_words = await client.get("/tasks/search?q=%21%21", headers=headers)
+
+    assert ranked.status_code == 200
+    assert [task["id"] for task in ranked.json()] == [titled, described]
+    assert [task["id"] for task in first.json() + second.json()] == [titled, described]
+    assert "x-next-cursor" not in second.headers
+    assert after_writes.json() == []
+    assert [task["id"] for task in renamed.json()] == [titled]
+    assert no_words.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_hot_task_queries_use_indexes():
+    # Every query on tasks behind these requests must reach its rows through
+    # an index search, never a scan of the whole table
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        created = await client.post("/tasks/bulk", json={
+            "items": [{"title": f"Planned task {i}"} for i in range(20)],
+        }, headers=headers)
+        task_id = created.json()["items"][0]["id"]
+        admin = await client.post("/auth/register", json={
+            "email": "planner@example.com",
+            "password": "pass123",
+        })
+        admin_headers = {"Authorization": f"Bearer {admin.json()['access_token']}"}
+        async with TestSessionLocal() as session:
+            await session.execute(
+                update(User).where(User.email == "planner@example.com").values(is_admin=True)
+            )
+            await session.commit()
+
+        statements = {}
+        for path, request_headers in (
+            ("/tasks/", headers),
+            ("/tasks/?status=todo", headers),
+            ("/tasks/?status=todo", admin_headers),
+            ("/tasks/changes", headers),
+            (f"/tasks/{task_id}", headers),
+        ):
+            captured = statements.setdefault((path, request_headers is admin_headers), [])
+
+            def record(conn, cursor, statement, parameters, *args):
+                if re.search(r"\bFROM tasks\b", statement):
+                    captured.append((statement, parameters))
+
+            event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+            try:
+                res = await client.get(path, headers=request_headers)
+            finally:
+                event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+            assert res.status_code == 200, path
+
+    plans = {}
+    async with test_engine.connect() as conn:
+        for request, queries in statements.items():
+            plans[request] = [
+                [row.detail for row in await conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ) if re.search(r"\btasks\b", row.detail)]
+                for statement, parameters in queries
+            ]
+
+    for request, request_plans in plans.items():
+        assert request_plans, request
+        for plan in request_plans:
+            assert plan and all(detail.startswith("SEARCH tasks USING") for detail in plan), (request, plan)
+    assert any(
+        "ix_tasks_status_created_at_id" in detail
+        for plan in plans[("/tasks/?status=todo", True)] for detail in plan
+    )
@@ -0,0 +1,198 @@
+import json
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.services.task_events import task_events
+from app.services.task_versions import task_list_cache
+from app.metrics import metrics
+from app.models.user import User
+from app.services.user_cache import user_cache
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_users.db"
+test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+TestSessionLocal = sessionmaker(
+    bind=test_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+async def override_get_db():
+    async with TestSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db():
+    app.dependency_overrides[get_db] = override_get_db
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+async def register(client: AsyncClient, email: str) -> str:
+    res = await client.post("/auth/register", json={
+        "email": email,
+        "password": "pass123"
+    })
+    return res.json()["access_token"]
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_and_invalidated_on_update():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        admin_token = await register(client, "admin@example.com")
+        user_token = await register(client, "member@example.com")
+        async with TestSessionLocal() as session:
+            await session.execute(
+                update(User)
+                .where(User.email == "admin@example.com")
+                .values(is_admin=True)
+            )
+            await session.commit()
+
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        user_headers = {"Authorization": f"Bearer {user_token}"}
+
+        me = await client.get("/users/me", headers=user_headers)
+        hits_before = metrics["user_cache_hits_total"]
+        again = await client.get("/users/me", headers=user_headers)
+        assert metrics["user_cache_hits_total"] == hits_before + 1
+        assert again.json() == me.json()
+        assert me.json()["is_admin"] is False
+
+        # Admin promotion must be visible immediately, not after the TTL
+        await client.patch(
+            f"/users/{me.json()['id']}",
+            json={"is_admin": True},
+            headers=admin_headers,
+        )
+        promoted = await client.get("/users/me", headers=user_headers)
+
+    assert promoted.json()["is_admin"] is True
+
+
+@pytest.mark.asyncio
+async def test_user_cache_is_invalidated_after_commit(monkeypatch):
+    # A request reading the user between the invalidation and the commit
+    # would cache the old row for the whole TTL, so by the time the entry is
+    # dropped the change must already be visible to other sessions
+    seen = []
+    invalidate = user_cache.invalidate
+
+    async def checked_invalidate(user_id):
+        async with TestSessionLocal() as session:
+            seen.append((await session.execute(
+                select(User.is_admin).where(User.id == user_id)
+            )).scalar_one_or_none())
+        await invalidate(user_id)
+
+    monkeypatch.setattr(user_cache, "invalidate", checked_invalidate)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        admin_token = await register(client, "admin@example.com")
+        user_token = await register(client, "member@example.com")
+        async with TestSessionLocal() as session:
+            await session.execute(
+                update(User)
+                .where(User.email == "admin@example.com")
+                .values(is_admin=True)
+            )
+            await session.commit()
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        user_headers = {"Authorization": f"Bearer {user_token}"}
+        user_id = (await client.get("/users/me", headers=user_headers)).json()["id"]
+
+        promoted = await client.patch(
+            f"/users/{user_id}", json={"is_admin": True}, headers=admin_headers
+        )
+        deleted = await client.delete(f"/users/{user_id}", headers=admin_headers)
+        after_delete = await client.get("/users/me", headers=user_headers)
+
+    assert promoted.status_code == 200
+    assert deleted.status_code == 204
+    # Promotion committed, then the row gone
+    assert seen == [True, None]
+    assert after_delete.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_deleting_user_changes_task_list_version():
+    task_list_cache.clear()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        admin_token = await register(client, "admin@example.com")
+        user_token = await register(client, "member@example.com")
+        async with TestSessionLocal() as session:
+            await session.execute(
+                update(User)
+                .where(User.email == "admin@example.com")
+                .values(is_admin=True)
+            )
+            await session.commit()
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        user_headers = {"Authorization": f"Bearer {user_token}"}
+        await client.post("/tasks/", json={"title": "Orphaned soon"}, headers=user_headers)
+        user_id = (await client.get("/users/me", headers=user_headers)).json()["id"]
+
+        before = await client.get("/tasks/", headers=admin_headers)
+        await client.delete(f"/users/{user_id}", headers=admin_headers)
+        revalidated = await client.get(
+            "/tasks/", headers={**admin_headers, "If-None-Match": before.headers["ETag"]}
+        )
+        listed = await client.get("/tasks/", headers=admin_headers)
+
+    assert [task["title"] for task in before.json()] == ["Orphaned soon"]
+    assert revalidated.status_code == 200
+    assert revalidated.headers["ETag"] != before.headers["ETag"]
+    assert listed.json() == []
+
+
+@pytest.mark.asyncio
+async def test_deleting_user_publishes_deleted_task_events():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        admin_token = await register(client, "admin@example.com")
+        user_token = await register(client, "member@example.com")
+        async with TestSessionLocal() as session:
+            await session.execute(
+                update(User)
+                .where(User.email == "admin@example.com")
+                .values(is_admin=True)
+            )
+            await session.commit()
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        user_headers = {"Authorization": f"Bearer {user_token}"}
+        task_ids = {
+            (await client.post(
+                "/tasks/", json={"title": f"Going away {i}"}, headers=user_headers
+            )).json()["id"]
+            for i in range(2)
+        }
+        user_id = (await client.get("/users/me", headers=user_headers)).json()["id"]
+
+        watcher = task_events.subscribe(User(id="watcher", is_admin=True))
+        try:
+            deleted = await client.delete(f"/users/{user_id}", headers=admin_headers)
+            frames = list(watcher.frames)
+        finally:
+            task_events.unsubscribe(watcher)
+
+    assert deleted.status_code == 204
+    assert all(frame.startswith("id: ") and "event: deleted" in frame for frame in frames)
+    assert {json.loads(frame.split("data: ", 1)[1])["id"] for frame in frames} == task_ids